@@ -0,0 +1,76 @@
+import argparse
+import os
+import time
+import numpy as np
+
+from mesh.mesh_parameters import MeshParameters
+from mesh.mesh_builder import MeshBuilder
+from portrait.numerator import Numerator
+from fem.matrix_assembler import MatrixAssembler
+
+# Масштабируемость параллельной сборки (MatrixAssembler с workers > 1) на сетке из area.json:
+# для каждого числа потоков - лучшее время сборки из repeats запусков, ускорение относительно
+# последовательной пакетной сборки и проверка, что di/gg/b совпадают с однопоточной параллельной сборкой
+
+def build_mesh(path: str, refinement: int):
+    parameters = MeshParameters.read_json(path)
+    parameters.refinement = refinement
+
+    mesh_builder = MeshBuilder(parameters)
+    mesh_builder.create_points()
+    mesh_builder.create_elements()
+    mesh_builder.create_boundaries()
+    mesh = mesh_builder.get_mesh()
+    Numerator.numerate_basis_functions(mesh)
+    return mesh
+
+def best_time(assemble, repeats: int):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        assemble()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def snapshot(assembler: MatrixAssembler):
+    matrix = assembler.global_matrix
+    return np.array(matrix.di), np.array(matrix.gg), np.array(assembler.global_b)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Масштабируемость параллельной сборки")
+    parser.add_argument("--input", default="input/area.json", help="файл area.json")
+    parser.add_argument("--refinement", type=int, default=6, help="уровень измельчения сетки")
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="числа потоков")
+    parser.add_argument("--repeats", type=int, default=3, help="число запусков для каждого варианта")
+    args = parser.parse_args()
+
+    workers_list = args.workers
+    if workers_list is None:
+        cpu_count = os.cpu_count() or 1
+        workers_list = sorted({1, 2, 4, 8, 16, 32, cpu_count} & set(range(1, cpu_count + 1)) | {1})
+
+    mesh = build_mesh(args.input, args.refinement)
+    print(f"Элементов: {len(mesh.elements)}, процессоров: {os.cpu_count()}")
+
+    serial = MatrixAssembler(mesh)
+    serial_time = best_time(serial.assemble, args.repeats)
+    print(f"Пакетная сборка: {serial_time:.3f} с")
+
+    # параллельная сборка с одним потоком - эталон для проверки детерминированности
+    reference = None
+    print("Потоки Время,с Ускорение Совпадает")
+
+    for workers in workers_list:
+        # при workers=1 assemble выбирает последовательную сборку, поэтому параллельная вызывается явно
+        assembler = MatrixAssembler(mesh, workers=workers)
+        if workers == 1:
+            assembler.prepare_colours()
+        elapsed = best_time(assembler.assemble_global_slae_parallel, args.repeats)
+
+        result = snapshot(assembler)
+        if reference is None:
+            reference = result
+        same = all(np.array_equal(a, b) for a, b in zip(result, reference))
+
+        print(f"{workers} {elapsed:.3f} {serial_time / elapsed:.2f} {same}")
@@ -0,0 +1,223 @@
+import argparse
+import copy
+import csv
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from mesh.mesh_parameters import MeshParameters
+from mesh.mesh_builder import MeshBuilder
+from mesh.point_array import PointArray
+from mesh.point_locator import PointLocator
+from fem.fem_solver import FemSolver
+from fem.nonlinear_solver import NonlinearSolver
+from fem.solve_report import SolveReport
+
+class ConvergenceStudy:
+    # Исследование сходимости при измельчении: решаются уровни 0..max_level (refinement в area.json),
+    # для каждого - погрешность в узлах (compare_solution_with_exact_in_nodes), погрешность в наборе точек
+    # (root_mean_square), число неизвестных и время. Точное решение берется из первого краевого условия.
+    # Порядок сходимости по соседним уровням: h ~ N^(-1/2), p = 2 * log(e_(l-1) / e_l) / log(N_l / N_(l-1)).
+    # Экстраполяция Ричардсона по значениям в точках трех последних уровней дает оценку решения u*
+    # и оценку погрешности каждого уровня без точного решения
+    table_columns = ["level", "dofs", "elements", "iterations", "nodal_error", "nodal_rate", "point_error",
+                     "point_rate", "estimated_error", "time"]
+
+    def __init__(self, parameters: MeshParameters, max_level: int, points_r=None, points_z=None, workers: int = 1,
+                 output_root: str = "output/convergence", order: float = 3.0):
+        self.parameters = parameters
+        self.max_level = max_level
+        self.workers = workers
+        self.output_root = output_root
+        # порядок для экстраполяции, если его не удается оценить по уровням (для биквадратичных элементов - 3)
+        self.order = order
+
+        if points_r is None:
+            points_r, points_z = ConvergenceStudy.default_points(parameters)
+        self.points_r, self.points_z = ConvergenceStudy.inside_points(parameters, points_r, points_z)
+
+        self.levels: list[dict] = []
+        self.extrapolated = np.zeros(0)        # u* в точках
+        self.extrapolation_order = math.nan    # порядок, использованный в экстраполяции
+
+    @staticmethod
+    def default_points(parameters: MeshParameters, count: int = 20):
+        # равномерная сетка count x count внутри прямоугольника, содержащего область
+        r = np.array([p.r for p in parameters.control_points])
+        z = np.array([p.z for p in parameters.control_points])
+        rs = np.linspace(r.min(), r.max(), count + 2)[1:-1]
+        zs = np.linspace(z.min(), z.max(), count + 2)[1:-1]
+        grid_r, grid_z = np.meshgrid(rs, zs)
+        return grid_r.ravel(), grid_z.ravel()
+
+    @staticmethod
+    def inside_points(parameters: MeshParameters, points_r, points_z):
+        # все уровни покрывают одну область, поэтому точки вне нее отбрасываются по сетке уровня 0
+        level_parameters = copy.deepcopy(parameters)
+        level_parameters.refinement = 0
+        mesh = ConvergenceStudy.build_mesh(level_parameters)
+
+        points_r = np.asarray(points_r, dtype=float)
+        points_z = np.asarray(points_z, dtype=float)
+        inside = PointLocator(mesh).locate(points_r, points_z) >= 0
+        return points_r[inside], points_z[inside]
+
+    @staticmethod
+    def build_mesh(parameters: MeshParameters):
+        mesh_builder = MeshBuilder(parameters)
+        mesh_builder.create_points()
+        mesh_builder.create_elements()
+        mesh_builder.create_boundaries()
+        return mesh_builder.get_mesh()
+
+    @staticmethod
+    def solve_level(parameters: MeshParameters, level: int, points_r: np.ndarray, points_z: np.ndarray,
+                    output_dir: str) -> dict:
+        level_parameters = copy.deepcopy(parameters)
+        level_parameters.refinement = level
+        os.makedirs(output_dir, exist_ok=True)
+
+        report = SolveReport()
+        with report.phase("mesh"):
+            mesh = ConvergenceStudy.build_mesh(level_parameters)
+
+        if any(area.nonlinear for area in level_parameters.area_properties):
+            # lmbda или gamma зависят от решения - как в main.py
+            solver = NonlinearSolver(mesh, method="newton", report=report, output_dir=output_dir)
+        else:
+            solver = FemSolver(mesh, report=report, output_dir=output_dir)
+        solver.solve()
+        report.dump_json(os.path.join(output_dir, "report.json"))
+
+        has_exact = len(mesh.dirichlet) > 0
+        return {
+            "level": level,
+            "dofs": report.size,
+            "elements": len(mesh.elements),
+            "iterations": report.iterations_count,
+            "nodal_error": solver.compare_solution_with_exact_in_nodes() if has_exact else math.nan,
+            "point_error": solver.root_mean_square(PointArray(points_r, points_z)) if has_exact else math.nan,
+            "time": report.total_time(),
+            "values": solver.values_at_points(points_r, points_z)
+        }
+
+    def run(self) -> list[dict]:
+        levels = range(self.max_level + 1)
+        output_dirs = [os.path.join(self.output_root, f"level_{level}") for level in levels]
+
+        if self.workers == 1:
+            self.levels = [ConvergenceStudy.solve_level(self.parameters, level, self.points_r, self.points_z, d)
+                           for level, d in zip(levels, output_dirs)]
+        else:
+            # самые дорогие (мелкие) уровни запускаются первыми
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {level: pool.submit(ConvergenceStudy.solve_level, self.parameters, level,
+                                              self.points_r, self.points_z, output_dirs[level])
+                           for level in reversed(levels)}
+                self.levels = [futures[level].result() for level in levels]
+
+        self.compute_rates()
+        self.extrapolate()
+        self.write_table(os.path.join(self.output_root, "convergence.csv"))
+        return self.levels
+
+    @staticmethod
+    def rate(error_coarse: float, error_fine: float, dofs_coarse: int, dofs_fine: int) -> float:
+        if not (error_coarse > 0.0 and error_fine > 0.0):
+            return math.nan
+        return 2.0 * math.log(error_coarse / error_fine) / math.log(dofs_fine / dofs_coarse)
+
+    def compute_rates(self):
+        for name in ("nodal", "point"):
+            self.levels[0][f"{name}_rate"] = math.nan
+
+            for coarse, fine in zip(self.levels, self.levels[1:]):
+                fine[f"{name}_rate"] = ConvergenceStudy.rate(coarse[f"{name}_error"], fine[f"{name}_error"],
+                                                             coarse["dofs"], fine["dofs"])
+
+    def extrapolate(self):
+        # u* = u_l + (u_l - u_(l-1)) / (2^p - 1), p - по трем последним уровням:
+        # |u_(l-2) - u_(l-1)| / |u_(l-1) - u_l| = 2^p
+        for level in self.levels:
+            level["estimated_error"] = math.nan
+
+        if len(self.levels) < 2 or len(self.points_r) == 0:
+            return
+
+        fine = self.levels[-1]["values"]
+        difference = fine - self.levels[-2]["values"]
+
+        order = self.order
+        if len(self.levels) >= 3:
+            coarse_difference = np.linalg.norm(self.levels[-2]["values"] - self.levels[-3]["values"])
+            fine_difference = np.linalg.norm(difference)
+            if coarse_difference > 0.0 and fine_difference > 0.0:
+                observed = math.log2(coarse_difference / fine_difference)
+                if observed > 0.0:
+                    order = observed
+
+        self.extrapolation_order = order
+        self.extrapolated = fine + difference / (2.0 ** order - 1.0)
+
+        extrapolated_norm = np.linalg.norm(self.extrapolated)
+        for level in self.levels:
+            error = np.linalg.norm(level["values"] - self.extrapolated)
+            level["estimated_error"] = error / extrapolated_norm if extrapolated_norm > 0.0 else error
+
+    def cheapest_level(self, target: float, measure: str = "nodal_error"):
+        # наименьший уровень с погрешностью measure ("nodal_error", "point_error", "estimated_error") не больше target.
+        # Если ни один решенный уровень не подходит, уровень предсказывается по порядку сходимости
+        # последней пары уровней (h уменьшается вдвое на каждом уровне); None - если порядок неизвестен
+        for level in self.levels:
+            if level[measure] <= target:
+                return level["level"]
+
+        last = self.levels[-1]
+        rates = {"nodal_error": last["nodal_rate"], "point_error": last["point_rate"]}
+        rate = rates.get(measure, self.extrapolation_order)
+        if not (rate > 0.0 and last[measure] > 0.0):
+            return None
+
+        return last["level"] + math.ceil(math.log2(last[measure] / target) / rate)
+
+    def write_table(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=ConvergenceStudy.table_columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self.levels)
+
+    def print_table(self):
+        print("Уровень Неизвестных Итерации Погрешность(узлы) Порядок Погрешность(точки) Порядок Оценка Время,с")
+
+        for l in self.levels:
+            print(f"{l['level']} {l['dofs']} {l['iterations']} {l['nodal_error']:.2e} {l['nodal_rate']:.2f} "
+                  f"{l['point_error']:.2e} {l['point_rate']:.2f} {l['estimated_error']:.2e} {l['time']:.3f}")
+
+        if len(self.extrapolated) > 0:
+            print(f"Экстраполяция Ричардсона: порядок {self.extrapolation_order:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Исследование сходимости при измельчении сетки")
+    parser.add_argument("levels", type=int, help="наибольший уровень измельчения")
+    parser.add_argument("--input", default="input/area.json", help="файл area.json")
+    parser.add_argument("--points", default=None, help='файл точек "r z" для погрешности в точках')
+    parser.add_argument("--output", default="output/convergence", help="папка для результатов")
+    parser.add_argument("--workers", type=int, default=1, help="число процессов")
+    parser.add_argument("--target", type=float, default=None, help="требуемая погрешность")
+    parser.add_argument("--measure", default="nodal_error", help="nodal_error, point_error или estimated_error")
+    args = parser.parse_args()
+
+    parameters = MeshParameters.read_json(args.input)
+    points_r, points_z = None, None
+    if args.points is not None:
+        points_r, points_z = np.loadtxt(args.points, ndmin=2).T
+
+    study = ConvergenceStudy(parameters, args.levels, points_r, points_z, args.workers, args.output)
+    study.run()
+    study.print_table()
+
+    if args.target is not None:
+        print(f"Наименьший уровень с погрешностью {args.target:.2e}: {study.cheapest_level(args.target, args.measure)}")
@@ -6,6 +6,7 @@ Mesh + Contour viewer
   - points : each line "r z" (two floats)
   - elements: each line "i1 i2 i3 i4" (four ints) - node indices: left-bottom, right-bottom, left-top, right-top
   - solution: each line "x y value" (three floats)
+  or a single binary file result.bin written by FemSolver(result_format="binary") (see result_bundle.py)
 
 Run: python3 mesh_viewer.py
 Dependencies: numpy, matplotlib
@@ -15,6 +16,8 @@ import sys
 import numpy as np
 import matplotlib
 
+from result_bundle import ResultBundle
+
 matplotlib.use('TkAgg')  # use Tk backend for embedding
 from matplotlib.figure import Figure
 from matplotlib.collections import PolyCollection
@@ -75,7 +78,19 @@ def read_solution(path):
 
 # ---------------------- Loading data ----------------------
 
+def load_bundle(path):
+    # arrays are memory-mapped, nothing is parsed or copied until it is used
+    data = ResultBundle.read(path)
+    nodes = data['basis_nodes']
+    sol = np.column_stack((nodes[:, 0], nodes[:, 1], data['solution']))
+    return data['points'], data['elements'], sol
+
+
 def detect_and_load(output_dir='output'):
+    bundle_path = os.path.join(output_dir, 'result.bin')
+    if os.path.isfile(bundle_path):
+        return load_bundle(bundle_path)
+
     pts_path = os.path.join(output_dir, 'points')
     elems_path = os.path.join(output_dir, 'elements')
     sol_path = os.path.join(output_dir, 'solution')
@@ -1,94 +1,256 @@
 import math
+import os
+import numpy as np
 
 from mesh.mesh import Mesh
+from mesh.mesh_parameters import MeshParameters
 from mesh.point import Point
+from mesh.formula import Formula
+from mesh.point_locator import PointLocator
 from portrait.numerator import Numerator
 from fem.basis import Basis
 from fem.matrix_assembler import MatrixAssembler
+from fem.reference_element import ReferenceElement
 from fem.los import Los
+from fem.ldlt import Ldlt
+from fem.preconditioner import Preconditioner
+from fem.solve_report import SolveReport
 from utils import Utils
 
 class FemSolver:
-    def __init__(self, mesh: Mesh):
-        Numerator.numerate_basis_functions(mesh)
-        Utils.save_mesh(mesh)
-        Utils.save_basis_info(mesh)
+    def __init__(self, mesh: Mesh, preconditioner: Preconditioner = None, solver=None, report: SolveReport = None,
+                 matrix_output: str = None, result_format: str = "text", output_dir: str = "output",
+                 workers: int = 1, cache=None, parameters: MeshParameters = None, incremental: bool = False):
+        # cache - SolveCache: портрет и собранная система берутся из кэша по ключам из parameters
+        # (параметры, по которым построена mesh, например SolveCache.build_mesh)
+        self.cache = cache if parameters is not None else None
+        self.parameters = parameters
+        # result_format: "text" - построчные файлы в output_dir, "binary" - один файл result.bin (ResultBundle)
+        self.result_format = result_format
+        self.output_dir = output_dir
+        # report - отчет, в который пишутся этапы расчета; можно передать уже содержащий этап построения сетки
+        self.report = report if report is not None else SolveReport()
+
+        with self.report.phase("numbering"):
+            Numerator.numerate_basis_functions(mesh)
+
+        if result_format == "text":
+            with self.report.phase("output"):
+                Utils.save_mesh(mesh, output_dir)
+                Utils.save_basis_info(mesh, output_dir)
 
         self.mesh = mesh
         self.basis = Basis
-        self.matrix_assembler = MatrixAssembler(mesh)
-        self.solver = Los(10000, 1e-20)
 
-    def solve(self):
-        matrix, vector = self.matrix_assembler.get_slae()
-        matrix.print_dense("output/global_matrix")
-        Utils.print_vector(vector, "global_vector")
+        with self.report.phase("portrait"):
+            # workers > 1 - параллельная сборка по цветам элементов; incremental - G и M подобластей хранятся
+            # отдельно, и при смене коэффициентов или f (set_problem, solve_many) пересборка - их комбинация
+            portrait = self.cache.portrait(mesh, parameters) if self.cache is not None else None
+            self.matrix_assembler = MatrixAssembler(mesh, workers=workers, portrait=portrait, incremental=incremental)
 
-        self.solver.compute(matrix, vector)
-        Utils.save_solution(self.mesh, self.solver.solution)
+        self.locator = PointLocator(mesh)
 
-    def compare_solution_with_exact_in_nodes(self):
-        values: dict[int, float] = {}
-        exact_function = self.mesh.dirichlet[0].value
+        # solver - любой решатель с compute(matrix, vector) и solution (Los, Ldlt)
+        self.solver = solver if solver is not None else Los(10000, 1e-12, preconditioner)
+        # вывод глобальной матрицы: None - не выводится, "npz" - ig/jg/di/gg в бинарном виде,
+        # "mtx" - Matrix Market, "dense" - плотная матрица текстом (только для отладки на малых сетках)
+        self.matrix_output = matrix_output
+
+    def set_problem(self, parameters: MeshParameters, output_dir: str = None):
+        # другая задача на той же сетке: коэффициенты, f и формулы краевых берутся из parameters, а сетка, нумерация,
+        # портрет и карта сборки переиспользуются. Границы (типы и formula_index) должны совпадать с исходными
+        self.use_formulas(parameters.area_properties, parameters.boundary_formulas)
+        self.parameters = parameters
+
+        self.report = SolveReport(self.report.track_memory)
+        if output_dir is not None:
+            self.output_dir = output_dir
+
+        if self.result_format == "text":
+            with self.report.phase("output"):
+                Utils.save_mesh(self.mesh, self.output_dir)
+                Utils.save_basis_info(self.mesh, self.output_dir)
+
+    def use_formulas(self, materials: list, boundary_formulas: list):
+        self.mesh.materials = materials
+        for conditions in (self.mesh.dirichlet, self.mesh.neumann, self.mesh.newton):
+            conditions.formulas = boundary_formulas
+
+    def solve_many(self, problems: list[MeshParameters], direct: bool = True) -> np.ndarray:
+        # Несколько задач с одной матрицей: у problems свои f и формулы краевых, но те же lmbda, gamma и beta,
+        # что и у текущей задачи сетки. Матрица собирается один раз, правые части - блок (n, k),
+        # direct=True - одно разложение Ldlt и решение всего блока, иначе - решатель self.solver для каждого столбца.
+        # Возвращает решения (n, k); формулы текущей задачи после решения восстанавливаются
+        materials = self.mesh.materials
+        boundary_formulas = self.mesh.dirichlet.formulas
+        coefficients = [(m.lmbda, m.gamma) for m in materials]
+        betas = self.mesh.newton.betas
+
+        with self.report.phase("assembly"):
+            matrix, _ = self.matrix_assembler.get_slae()
+
+        assembler = self.matrix_assembler
+        right_parts = np.zeros((matrix.size, len(problems)))
+
+        with self.report.phase("right_parts"):
+            # при incremental правые части считаются по собранным M подобластей
+            mass = None if assembler.incremental else ReferenceElement.mass(*assembler.element_bounds)
+
+            try:
+                for column, problem in enumerate(problems):
+                    self.use_formulas(problem.area_properties, problem.boundary_formulas)
+
+                    if [(m.lmbda, m.gamma) for m in problem.area_properties] != coefficients or \
+                            not np.array_equal(self.mesh.newton.betas, betas):
+                        raise Exception(f"Problem {column} has other lmbda, gamma or beta than the assembled matrix")
+
+                    right_parts[:, column] = assembler.right_part(mass)
+            finally:
+                self.use_formulas(materials, boundary_formulas)
+
+        with self.report.phase("solve"):
+            if direct:
+                solver = self.solver if isinstance(self.solver, Ldlt) else Ldlt()
+                solver.factorize(matrix)
+                solutions = solver.solve(right_parts)
+            else:
+                solver = self.solver
+                solutions = np.zeros_like(right_parts)
+                for column in range(len(problems)):
+                    solver.compute(matrix, right_parts[:, column])
+                    solutions[:, column] = solver.solution
+
+        # в отчет - наибольшая относительная невязка по столбцам
+        relative_residuals = []
+        for column in range(len(problems)):
+            self.report.record_solver(solver, matrix, right_parts[:, column], solutions[:, column])
+            relative_residuals.append(self.report.relative_residual)
+        self.report.relative_residual = max(relative_residuals, default=0.0)
+
+        return solutions
 
-        for element in self.mesh.elements:
-            for local_basis in range(len(element.basis_indices)):
-                global_basis = element.basis_indices[local_basis]
+    def solve(self) -> SolveReport:
+        matrix = self.matrix_assembler.global_matrix
+        system = None
 
-                if not global_basis in values:
-                    p = element.get_basis_node_position(local_basis, lambda idx: self.mesh.points[idx])
-                    values[global_basis] = exact_function(p.r, p.z)
+        if self.cache is not None:
+            with self.report.phase("cache"):
+                system = self.cache.load_system(self.parameters)
 
-        dif_square = 0.0
-        exact_square = 0.0
+        if system is not None:
+            matrix.di[:], matrix.gg[:], self.matrix_assembler.global_b, self.matrix_assembler.dirichlet_lifting = system
+        else:
+            with self.report.phase("assembly"):
+                self.matrix_assembler.assemble()
 
-        for i in range(len(self.solver.solution)):
-            dif_square += (self.solver.solution[i] - values[i]) * (self.solver.solution[i] - values[i])
-            exact_square += values[i] * values[i]
+            with self.report.phase("boundary_conditions"):
+                self.matrix_assembler.account_boundary_conditions()
 
-        return math.sqrt(dif_square) / math.sqrt(exact_square)
+            if self.cache is not None:
+                with self.report.phase("cache"):
+                    self.cache.store_system(self.parameters, matrix, self.matrix_assembler.global_b,
+                                            self.matrix_assembler.dirichlet_lifting)
 
-    def root_mean_square(self, points: list[Point]):
+        vector = self.matrix_assembler.global_b
+
+        with self.report.phase("output"):
+            self.save_matrix(matrix)
+            if self.result_format == "text":
+                Utils.print_vector(vector, "global_vector", self.output_dir)
+
+        with self.report.phase("solve"):
+            self.solver.compute(matrix, vector)
+
+        self.report.record_solver(self.solver, matrix, vector, self.solver.solution)
+        self.save_results()
+
+        return self.report
+
+    def save_results(self):
+        with self.report.phase("output"):
+            if self.result_format == "binary":
+                Utils.save_result_bundle(self.mesh, self.solver.solution, self.output_dir)
+            else:
+                Utils.save_solution(self.mesh, self.solver.solution, self.output_dir)
+
+    def save_matrix(self, matrix):
+        if self.matrix_output is None:
+            return
+
+        if self.matrix_output == "npz":
+            matrix.save(os.path.join(self.output_dir, "global_matrix.npz"))
+        elif self.matrix_output == "mtx":
+            matrix.write_matrix_market(os.path.join(self.output_dir, "global_matrix.mtx"))
+        elif self.matrix_output == "dense":
+            matrix.print_dense(os.path.join(self.output_dir, "global_matrix"))
+        else:
+            raise Exception(f"Unknown matrix output format: {self.matrix_output}")
+
+    def compare_solution_with_exact_in_nodes(self):
+        exact_function = self.mesh.dirichlet[0].value
+        exact = Formula.evaluate_function(exact_function, self.matrix_assembler.basis_r, self.matrix_assembler.basis_z)
+        difference = np.asarray(self.solver.solution) - exact
+
+        return math.sqrt(difference @ difference) / math.sqrt(exact @ exact)
+
+    def root_mean_square(self, points: list[Point], verbose: bool = False):
         func = self.mesh.dirichlet[0].value
-        dif_square = 0.0
-        exact_square = 0.0
+        rs = np.array([p.r for p in points])
+        zs = np.array([p.z for p in points])
 
-        print("Сетка Точное Численное Вектор погрешности")
+        exact = Formula.evaluate_function(func, rs, zs)
+        numeric = self.values_at_points(rs, zs)
 
-        for p in points:
-            exact = func(p.r, p.z)
-            numeric = self.value_at_point(p.r, p.z)
+        if verbose:
+            print("Сетка Точное Численное Вектор погрешности")
 
-            dif_square += (exact - numeric) * (exact - numeric)
-            exact_square += exact * exact
+            for r, z, e, n in zip(rs, zs, exact, numeric):
+                print(f"{r:.2e} {z:.2e} {e:.2e} {n:.2e} {abs(e - n):.2e}")
 
-            print(f"{p.r:.2e} {p.z:.2e} {exact:.2e} {numeric:.2e} {abs(exact - numeric):.2e}")
-        return math.sqrt(dif_square) / math.sqrt(exact_square)
+        return math.sqrt(((exact - numeric) ** 2).sum()) / math.sqrt((exact ** 2).sum())
 
     def value_at_point(self, x: float, y: float):
-        point = Point(x, y)
-        ielem = self.find_number_element(point)
+        return float(self.values_at_points(x, y)[0])
 
-        if ielem == -1:
-            return -float('inf')
+    def local_coordinates(self, rs, zs):
+        # элементы, содержащие точки, и координаты точек на эталонном квадрате
+        rs = np.atleast_1d(np.asarray(rs, dtype=float))
+        zs = np.atleast_1d(np.asarray(zs, dtype=float))
+        elements = self.locator.locate(rs, zs)
+        found = elements != -1
 
-        element = self.mesh.elements[ielem]
-        result = 0.0
+        rk, rk1, zk, zk1 = (bound[elements[found]] for bound in self.matrix_assembler.element_bounds)
+        hr = rk1 - rk
+        hz = zk1 - zk
 
-        for i in range(9):
-            global_index = element.get_global_basis_index(i)
-            result += self.basis.psi(self.mesh, ielem, i, point.r, point.z) * self.solver.solution[global_index]
+        return elements[found], found, (rs[found] - rk) / hr, (zs[found] - zk) / hz, hr, hz
 
-        return result
+    def values_at_points(self, rs, zs) -> np.ndarray:
+        # значения решения в точках; для точек вне сетки - минус бесконечность, как в value_at_point
+        elements, found, xi, eta, _, _ = self.local_coordinates(rs, zs)
+        # веса решения на элементе: q[n, b, a] для локальной функции 3 * b + a
+        q = self.solver.solution[self.matrix_assembler.element_basis[elements]].reshape(-1, 3, 3)
 
-    def find_number_element(self, point: Point):
-        for ielem in range(len(self.mesh.elements)):
-            element = self.mesh.elements[ielem]
-            left_bottom = self.mesh.points[element.physical_nodes_indices[0]]
-            right_top = self.mesh.points[element.physical_nodes_indices[-1]]
+        values = np.full(len(found), -np.inf)
+        values[found] = np.einsum("nba,bn,an->n", q, ReferenceElement.psi_1d(eta), ReferenceElement.psi_1d(xi))
+        return values
 
-            if left_bottom.r <= point.r <= right_top.r and \
-                left_bottom.z <= point.z <= right_top.z:
-                return ielem
+    def gradients_at_points(self, rs, zs) -> np.ndarray:
+        # градиент решения (du/dr, du/dz) в точках, массив (n, 2); для точек вне сетки - nan
+        elements, found, xi, eta, hr, hz = self.local_coordinates(rs, zs)
+        q = self.solver.solution[self.matrix_assembler.element_basis[elements]].reshape(-1, 3, 3)
+
+        psi_r, d_psi_r = ReferenceElement.psi_1d(xi), ReferenceElement.d_psi_1d(xi)
+        psi_z, d_psi_z = ReferenceElement.psi_1d(eta), ReferenceElement.d_psi_1d(eta)
+
+        gradients = np.full((len(found), 2), np.nan)
+        gradients[found, 0] = np.einsum("nba,bn,an->n", q, psi_z, d_psi_r) / hr
+        gradients[found, 1] = np.einsum("nba,bn,an->n", q, d_psi_z, psi_r) / hz
+        return gradients
+
+    def find_number_element(self, point: Point):
+        return self.locator.locate_point(point.r, point.z)
 
-        return -1
\ No newline at end of file
+    def locate(self, rs, zs):
+        # номера элементов для массивов точек (-1 для точек вне сетки)
+        return self.locator.locate(rs, zs)
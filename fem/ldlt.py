@@ -0,0 +1,109 @@
+import time
+import numpy as np
+
+from fem.sparse_matrix import SparseMatrix
+
+class Ldlt:
+    # Прямой решатель A = L * D * L^T в ленточном формате.
+    # Ширина ленты берется из профиля ig/jg: при нумерации Numerator она порядка 4 * nx,
+    # поэтому разложение стоит O(n * width^2), а каждое решение - O(n * width)
+    def __init__(self, block_size: int = 32):
+        self.block_size = block_size
+        self.solution = np.zeros(0)
+        self.size: int = 0
+        self.width: int = 0
+        # band[d, k] = L[k + d, k] для d > 0, band[0, k] = D[k]
+        self.band = np.zeros((1, 0))
+        self.factorization_time: float = 0.0
+        self.elapsed_time: float = 0.0
+        self.iterations_count: int = 0
+
+    def factorize(self, matrix: SparseMatrix):
+        start = time.perf_counter()
+
+        ig = np.asarray(matrix.ig)
+        jg = np.asarray(matrix.jg)
+        n = matrix.size
+        rows = np.repeat(np.arange(n), np.diff(ig))
+        width = int((rows - jg).max()) if len(jg) > 0 else 0
+        block = self.block_size
+        size = width + block
+
+        # строки исходной матрицы в ленточном виде: row_band[i, d] = A[i, i - d];
+        # после последней строки матрица дополнена единичной, чтобы окно не выходило за границу
+        row_band = np.zeros((n + size + block, width + 1))
+        row_band[:n, 0] = matrix.di
+        row_band[rows, rows - jg] = matrix.gg
+        row_band[n:, 0] = 1.0
+
+        band = np.zeros((width + 1, n + size))
+
+        # Плотное окно A[k..k+size-1, k..k+size-1]. На каждом шаге исключается блок из block столбцов:
+        # сначала поочередно внутри блока, затем остаток окна обновляется одним матричным произведением
+        window = np.zeros((size, size))
+        Ldlt.fill_rows(window, row_band, 0, 0, width)
+
+        for k in range(0, n, block):
+            for j in range(block):
+                pivot = window[j, j]
+                if pivot == 0.0:
+                    raise Exception(f"Zero pivot in LDL^T factorization at row {k + j}")
+
+                column = window[j + 1:, j] / pivot
+                window[j + 1:, j + 1:block] -= pivot * np.outer(column, column[:block - j - 1])
+                window[j + 1:, j] = column
+
+                band[0, k + j] = pivot
+                band[1:, k + j] = column[:width]
+
+            panel = window[block:, :block]
+            window[block:, block:] -= (panel * np.diag(window)[:block]) @ panel.T
+
+            # сдвиг окна на block строк вниз
+            window[:width, :width] = window[block:, block:]
+            window[width:, :] = 0.0
+            window[:, width:] = 0.0
+            Ldlt.fill_rows(window, row_band, width, k + block, width)
+
+        self.size = n
+        self.width = width
+        self.band = band
+        self.factorization_time = time.perf_counter() - start
+
+    @staticmethod
+    def fill_rows(window: np.ndarray, row_band: np.ndarray, first: int, offset: int, width: int):
+        # строки окна first..size-1 заполняются исходными элементами A (окно начинается со строки offset)
+        for i in range(first, len(window)):
+            left = max(i - width, 0)
+            values = row_band[offset + i, i - left::-1]
+            window[i, left:i + 1] = values
+            window[left:i + 1, i] = values
+
+    def solve(self, right_part) -> np.ndarray:
+        # L * y = b, D * w = y, L^T * x = w
+        # right_part - вектор (n) или блок правых частей (n, k): для блока все столбцы решаются за один проход
+        right_part = np.asarray(right_part, dtype=float)
+        n = self.size
+        width = self.width
+        x = np.zeros((n + width,) + right_part.shape[1:])
+        x[:n] = right_part
+
+        # для блока столбцы ленты умножаются на строки x: (width, 1) * (k) -> (width, k)
+        band = self.band if right_part.ndim == 1 else self.band[:, :, None]
+
+        for k in range(n):
+            x[k + 1:k + 1 + width] -= band[1:, k] * x[k]
+
+        x[:n] /= band[0, :n]
+
+        for k in range(n - 1, -1, -1):
+            x[k] -= self.band[1:, k] @ x[k + 1:k + 1 + width]
+
+        return x[:n]
+
+    def compute(self, matrix: SparseMatrix, right_part):
+        # тот же интерфейс, что и у Los: разложение + одно решение
+        start = time.perf_counter()
+        self.factorize(matrix)
+        self.solution = self.solve(right_part)
+        self.elapsed_time = time.perf_counter() - start
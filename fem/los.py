@@ -1,55 +1,110 @@
+import time
+import numpy as np
+
 from fem.sparse_matrix import SparseMatrix
-from mesh.point import Point
+from fem.preconditioner import Preconditioner
 
 class Los:
-    def __init__(self, max_iterations: int, eps: float):
+    def __init__(self, max_iterations: int, eps: float, preconditioner: Preconditioner = None):
         self.max_iterations = max_iterations
+        # eps - относительная невязка: счет прекращается при ||b - Ax|| / ||b|| < eps. Невязка исходной системы
+        # (а не M^-1 * (b - Ax)), поэтому точность решения не зависит от предобуславливателя
         self.eps = eps
-        self.solution: list[float] = []
+        self.preconditioner = preconditioner if preconditioner is not None else Preconditioner()
+        self.solution = np.zeros(0)
         self.iterations_count: int = 0
+        # относительные невязки ||b - Ax|| / ||b||: начальная и после каждой итерации
+        self.residual_history: list[float] = []
+        self.build_time: float = 0.0
+        self.elapsed_time: float = 0.0
 
-    def compute(self, matrix: SparseMatrix, right_part: list[float]):
+    def compute(self, matrix: SparseMatrix, right_part, initial=None, build_preconditioner: bool = True):
+        # initial - начальное приближение (по умолчанию 0); build_preconditioner=False - предобуславливатель
+        # уже построен для этой матрицы предыдущим вызовом
         try:
+            start = time.perf_counter()
+            if build_preconditioner:
+                self.preconditioner.build(matrix)
+                self.build_time = time.perf_counter() - start
+            else:
+                self.build_time = 0.0
+
+            right_part = np.asarray(right_part, dtype=float)
             n = len(right_part)
-            self.solution = [0.0] * n
+            self.solution = np.zeros(n) if initial is None else np.array(initial, dtype=float)
+
+            # при b = 0 критерий - абсолютная невязка
+            right_part_norm = float(np.linalg.norm(right_part))
+            scale = right_part_norm if right_part_norm > 0.0 else 1.0
 
-            z = [0.0] * n
-            r = [0.0] * n
-            p = [0.0] * n
-            product = [0.0] * n
+            r = np.empty(n)
+            p = np.empty(n)
+            product = np.empty(n)
+            preconditioned = np.empty(n)
 
-            # r = right_part - A * solution
-            SparseMatrix.dot(matrix, self.solution, product)
-            for i in range(n):
-                r[i] = right_part[i] - product[i]
+            # residual = b - A * solution, r = M^-1 * residual
+            residual = np.empty(n)
+            matrix.dot(self.solution, product)
+            np.subtract(right_part, product, out=residual)
+            self.preconditioner.apply(residual, r)
 
+            # az = A * z обновляется вместе с z, поэтому невязка исходной системы не требует лишних умножений
             z = r.copy()
-            SparseMatrix.dot(matrix, z, p)
+            az = np.empty(n)
+            matrix.dot(z, az)
+            self.preconditioner.apply(az, p)
 
-            square_norm = Point.dot(r, r)
+            relative = np.linalg.norm(residual) / scale
+            self.residual_history = [float(relative)]
 
             for self.iterations_count in range(self.max_iterations):
-                if square_norm < self.eps:
+                if relative < self.eps:
                     break
 
-                alpha = Point.dot(p, r) / Point.dot(p, p)
+                pp = p @ p
+                alpha = (p @ r) / pp
 
-                for i in range(n):
-                    self.solution[i] += alpha * z[i]
-                    r[i] -= alpha * p[i]
+                self.solution += alpha * z
+                r -= alpha * p
+                residual -= alpha * az
 
-                square_norm = Point.dot(r, r)
+                relative = np.linalg.norm(residual) / scale
+                self.residual_history.append(float(relative))
 
-                if square_norm < self.eps:
+                if relative < self.eps:
                     break
 
-                SparseMatrix.dot(matrix, r, product)
-                beta = -Point.dot(p, product) / Point.dot(p, p)
+                matrix.dot(r, product)
+                self.preconditioner.apply(product, preconditioned)
+                beta = -(p @ preconditioned) / pp
 
-                for i in range(n):
-                    z[i] = r[i] + beta * z[i]
-                    p[i] = product[i] + beta * p[i]
+                z *= beta
+                z += r
+                az *= beta
+                az += product
+                p *= beta
+                p += preconditioned
+
+            self.elapsed_time = time.perf_counter() - start
 
         except Exception as e:
             print(f"We had problem: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    @staticmethod
+    def compare_preconditioners(matrix: SparseMatrix, right_part, preconditioners: list[Preconditioner],
+                                max_iterations: int = 10000, eps: float = 1e-12):
+        # решает одну и ту же систему с каждым предобуславливателем и печатает число итераций и время;
+        # критерий остановки (относительная невязка исходной системы) у всех один
+        results = []
+
+        print("Предобуславливатель Итерации Построение,с Всего,с")
+
+        for preconditioner in preconditioners:
+            solver = Los(max_iterations, eps, preconditioner)
+            solver.compute(matrix, right_part)
+            results.append((preconditioner.name, solver.iterations_count, solver.build_time, solver.elapsed_time))
+
+            print(f"{preconditioner.name} {solver.iterations_count} {solver.build_time:.3f} {solver.elapsed_time:.3f}")
+
+        return results
@@ -1,116 +1,397 @@
-from fem.matrix import Matrix
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
 from mesh.mesh import Mesh
+from mesh.formula import Formula
+from mesh.boundary_condition_array import BoundaryConditionArray
 from fem.basis import Basis
 from fem.integrator import Integrator
+from fem.reference_element import ReferenceElement
 from portrait.portrait_builder import PortraitBuilder
+from portrait.numerator import Numerator
 from fem.sparse_matrix import SparseMatrix
 from mesh.biquadratic_quad_element import BiquadraticQuadElement
-from typing import List, Tuple, Set
 
 class MatrixAssembler:
-    def __init__(self, mesh: Mesh):
+    def __init__(self, mesh: Mesh, batched: bool = True, workers: int = 1, chunk_size: int = 4096,
+                 portrait: tuple = None, incremental: bool = False):
         self.mesh = mesh
-
-        self.ig, self.jg = PortraitBuilder.generate_portrait(mesh)
-
-        self.G = Matrix(9, 9)    # stiffness (local)
-        self.M = Matrix(9, 9)    # mass (local)
-        self.local_b: List[float] = [0.0] * 9   # local RHS (M * f)
-        self.local_f: List[float] = [0.0] * 9   # local source values
-
-        self.global_b = [0.0] * (len(self.ig) - 1)
+        self.batched = batched
+        # incremental - глобальные матрицы жесткости и масс каждой подобласти собираются один раз (build_operators),
+        # а пересборка - их линейная комбинация с lmbda и gamma и произведения масс на значения f в узлах
+        self.incremental = incremental
+        # workers > 1 - пакетная сборка в пуле потоков по цветам элементов (assemble_global_slae_parallel)
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+        # portrait - уже построенные (ig, jg, scatter_map), например из SolveCache
+        if portrait is not None:
+            self.ig, self.jg, scatter_map = portrait
+        else:
+            self.ig, self.jg = PortraitBuilder.generate_portrait(mesh)
+            scatter_map = None
+
+        self.G = np.zeros((9, 9))    # stiffness (local)
+        self.M = np.zeros((9, 9))    # mass (local)
+        self.local_b = np.zeros(9)   # local RHS (M * f)
+        self.local_f = np.zeros(9)   # local source values
+        self.element_f = None        # f в узлах всех элементов (source_values)
+
+        self.global_b = np.zeros(len(self.ig) - 1)
         self.global_matrix = SparseMatrix(self.ig, self.jg)
+        # G и M подобластей в портрете ig/jg: stiffness_di[area], stiffness_gg[area] и т.д. (build_operators)
+        self.stiffness_di = None
+        self.stiffness_gg = None
+        self.mass_di = None
+        self.mass_gg = None
+        self.mass_operator = None
+        # перенос первых краевых в правую часть (account_dirichlet): b[rows] -= coefficients * u[cols]
+        self.dirichlet_lifting = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+
+        # связность и геометрия элементов в виде массивов для пакетной сборки
+        points_r = mesh.points.r
+        points_z = mesh.points.z
+        nodes = mesh.elements.corners
+
+        self.element_basis = mesh.elements.basis.astype(np.int64)
+        self.element_areas = mesh.elements.area_numbers
+        self.element_bounds = (points_r[nodes[:, 0]], points_r[nodes[:, -1]],
+                               points_z[nodes[:, 0]], points_z[nodes[:, -1]])
+        self.basis_r, self.basis_z = Numerator.basis_node_positions(mesh)
+
+        # карта позиций в gg для каждого элемента строится один раз и переиспользуется при пересборке
+        self.scatter_map = (scatter_map if scatter_map is not None
+                            else PortraitBuilder.generate_scatter_map(mesh, self.ig, self.jg))
+        self.global_matrix.set_scatter_map(self.element_basis, self.scatter_map)
+
+        rows = self.element_basis[:, :, None]
+        cols = self.element_basis[:, None, :]
+        self.lower_mask = rows > cols
+        self.diagonal_mask = rows == cols
+        self.lower_positions = self.scatter_map[self.lower_mask]
+        self.diagonal_rows = np.broadcast_to(rows, self.scatter_map.shape)[self.diagonal_mask]
+
+        if workers > 1:
+            self.prepare_colours()
 
     def get_slae(self):
-        self.assemble_global_slae()
+        self.assemble()
+        self.account_boundary_conditions()
 
+        return self.global_matrix, self.global_b
+
+    def assemble(self):
+        # коэффициенты, зависящие от решения, собираются по значениям u (assemble_point_matrix, NonlinearSolver)
+        if any(material.nonlinear for material in self.mesh.materials):
+            raise Exception("Coefficients depend on the solution: use NonlinearSolver for this problem")
+
+        if self.incremental:
+            self.assemble_global_slae_incremental()
+        elif self.batched and self.workers > 1:
+            self.assemble_global_slae_parallel()
+        elif self.batched:
+            self.assemble_global_slae_batched()
+        else:
+            self.assemble_global_slae()
+
+    def account_boundary_conditions(self):
         # сначала учитываются 2 и 3 краевые (порядок неважен)
         # 1-е краевые учитываются в последнюю очередь
         self.account_newton()
         self.account_neumann()
         self.account_dirichlet()
 
-        return self.global_matrix, self.global_b
-
     def assemble_global_slae(self):
         self.global_matrix.clear()
         # обнуляем глобальную правую часть
-        self.global_b = [0.0] * len(self.global_b)
+        self.global_b = np.zeros(len(self.global_b))
+        self.element_f = self.source_values()
 
-        for ielem in range(len(self.mesh.elements)):
-            mat = self.mesh.materials[self.mesh.elements[ielem].area_number]
+        for ielem in range(len(self.element_basis)):
+            mat = self.mesh.materials[self.element_areas[ielem]]
             lmbda = mat.lmbda
             gamma = mat.gamma
 
             self.assemble_local_slae(ielem)
-
-            for i in range(9):
-                global_i = self.mesh.elements[ielem].get_global_basis_index(i)
-                self.global_b[global_i] += self.local_b[i]
-
-                for j in range(9):
-                    global_j = self.mesh.elements[ielem].get_global_basis_index(j)
-                    value = lmbda * self.G[i, j] + gamma * self.M[i, j]
-                    self.global_matrix.add(global_i, global_j, value)
+            self.global_matrix.add_local(ielem, lmbda * self.G + gamma * self.M)
+
+            # номера базисных функций элемента различны, поэтому сложение без повторов
+            self.global_b[self.element_basis[ielem]] += self.local_b
+
+    def assemble_global_slae_batched(self):
+        materials = self.mesh.materials
+        lmbda = np.array([m.lmbda for m in materials], dtype=float)[self.element_areas]
+        gamma = np.array([m.gamma for m in materials], dtype=float)[self.element_areas]
+
+        self.assemble_element_values(lmbda, gamma)
+
+    def assemble_element_values(self, lmbda: np.ndarray, gamma: np.ndarray):
+        # сборка с постоянными на элементах коэффициентами (n_elem):
+        # все локальные матрицы считаются одним массивом (n_elem, 9, 9), а затем суммируются в ig/jg/di/gg
+        mass = ReferenceElement.mass(*self.element_bounds)
+        local_matrices = (lmbda[:, None, None] * ReferenceElement.stiffness(*self.element_bounds)
+                          + gamma[:, None, None] * mass)
+
+        global_b = self.source_vector(mass)
+
+        self.scatter_local_matrices(local_matrices)
+        self.global_b = global_b
+
+    def assemble_point_matrix(self, lmbda: np.ndarray, gamma: np.ndarray):
+        # только матрица (без правой части и краевых) с коэффициентами в 25 точках квадратуры каждого элемента
+        # (n_elem, 25), например lmbda(u) и gamma(u) нелинейной задачи
+        local_matrices = (ReferenceElement.stiffness_at_points(lmbda, *self.element_bounds)
+                          + ReferenceElement.mass_at_points(gamma, *self.element_bounds))
+        self.scatter_local_matrices(local_matrices)
+
+    def scatter_local_matrices(self, local_matrices: np.ndarray):
+        # сумма локальных матриц (n_elem, 9, 9) в di/gg глобальной матрицы
+        func_count = len(self.global_b)
+        self.global_matrix.di[:] = np.bincount(self.diagonal_rows, local_matrices[self.diagonal_mask],
+                                               minlength=func_count)
+        self.global_matrix.gg[:] = np.bincount(self.lower_positions, local_matrices[self.lower_mask],
+                                               minlength=len(self.jg))
+
+    def prepare_colours(self):
+        # элементы каждого цвета делятся на части не больше chunk_size; у каждого элемента 36 связей
+        # нижнего треугольника: их номера в локальной матрице (9 * 9) и позиции в gg
+        elements_count = len(self.element_basis)
+        colours = PortraitBuilder.element_colours(self.mesh)
+
+        self.colour_chunks = []
+        for colour in range(int(colours.max()) + 1 if elements_count > 0 else 0):
+            elements = np.flatnonzero(colours == colour)
+            parts = max(self.workers, -(-len(elements) // self.chunk_size))
+            self.colour_chunks.append([c for c in np.array_split(elements, parts) if len(c) > 0])
+
+        self.lower_local = np.nonzero(self.lower_mask.reshape(elements_count, 81))[1].reshape(elements_count, -1)
+        self.element_lower_positions = self.lower_positions.reshape(elements_count, -1)
+
+    def assemble_global_slae_parallel(self):
+        # цвета собираются по очереди, внутри цвета части элементов - в пуле потоков (NumPy отпускает GIL
+        # в einsum и арифметике). Элементы одного цвета не имеют общих функций, поэтому части пишут
+        # в разные позиции di/gg/b без блокировок, а порядок сложения в каждой позиции задается только
+        # порядком цветов - результат не зависит от числа потоков
+        materials = self.mesh.materials
+        lmbda = np.array([m.lmbda for m in materials], dtype=float)[self.element_areas]
+        gamma = np.array([m.gamma for m in materials], dtype=float)[self.element_areas]
+        local_f = self.source_values()
+
+        matrix = self.global_matrix
+        matrix.di[:] = 0.0
+        matrix.gg[:] = 0.0
+        self.global_b = np.zeros(len(self.global_b))
+
+        def assemble_chunk(elements: np.ndarray):
+            bounds = tuple(bound[elements] for bound in self.element_bounds)
+            mass = ReferenceElement.mass(*bounds)
+            local_matrices = (lmbda[elements, None, None] * ReferenceElement.stiffness(*bounds)
+                              + gamma[elements, None, None] * mass)
+            basis = self.element_basis[elements]
+
+            lower = np.take_along_axis(local_matrices.reshape(len(elements), 81), self.lower_local[elements], axis=1)
+            matrix.gg[self.element_lower_positions[elements]] += lower
+            matrix.di[basis] += np.einsum("eii->ei", local_matrices)
+            self.global_b[basis] += np.einsum("eij,ej->ei", mass, local_f[elements])
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for chunks in self.colour_chunks:
+                list(pool.map(assemble_chunk, chunks))
+
+    def build_operators(self):
+        # глобальные G и M для каждой подобласти: вклады элементов суммируются в позиции
+        # area * size + позиция, поэтому все подобласти собираются одним bincount
+        func_count = len(self.global_b)
+        nnz = len(self.jg)
+        areas_count = max(len(self.mesh.materials), int(self.element_areas.max()) + 1 if len(self.element_areas) else 0)
+
+        areas = self.element_areas.astype(np.int64)
+        diagonal_index = np.repeat(areas, 9) * func_count + self.diagonal_rows
+        lower_index = np.repeat(areas, 36) * nnz + self.lower_positions
+
+        def scatter(local_matrices: np.ndarray):
+            di = np.bincount(diagonal_index, local_matrices[self.diagonal_mask], minlength=areas_count * func_count)
+            gg = np.bincount(lower_index, local_matrices[self.lower_mask], minlength=areas_count * nnz)
+            return di.reshape(areas_count, func_count), gg.reshape(areas_count, nnz)
+
+        self.stiffness_di, self.stiffness_gg = scatter(ReferenceElement.stiffness(*self.element_bounds))
+        self.mass_di, self.mass_gg = scatter(ReferenceElement.mass(*self.element_bounds))
+
+        # матрица для умножения M подобласти на вектор: di и gg подменяются ссылками на строки mass_di, mass_gg
+        self.mass_operator = SparseMatrix(self.ig, self.jg)
+
+    def assemble_global_slae_incremental(self):
+        # A = sum(lmbda_area * G_area + gamma_area * M_area), b = sum(M_area * f_area)
+        if self.stiffness_di is None:
+            self.build_operators()
+
+        areas_count = len(self.stiffness_di)
+        lmbda = np.zeros(areas_count)
+        gamma = np.zeros(areas_count)
+        lmbda[:len(self.mesh.materials)] = [m.lmbda for m in self.mesh.materials]
+        gamma[:len(self.mesh.materials)] = [m.gamma for m in self.mesh.materials]
+
+        matrix = self.global_matrix
+        matrix.di[:] = lmbda @ self.stiffness_di + gamma @ self.mass_di
+        matrix.gg[:] = lmbda @ self.stiffness_gg + gamma @ self.mass_gg
+        self.global_b = self.source_vector()
+
+    def source_vector(self, mass: np.ndarray = None) -> np.ndarray:
+        # вклад f в глобальную правую часть: сумма M * f по элементам
+        if self.mass_operator is not None:
+            # по собранным M подобластей: одно умножение на вектор для каждой подобласти
+            global_b = np.zeros(len(self.global_b))
+            for area, values in enumerate(self.area_sources()):
+                self.mass_operator.di = self.mass_di[area]
+                self.mass_operator.gg = self.mass_gg[area]
+                global_b += self.mass_operator.dot(values)
+            return global_b
+
+        if mass is None:
+            mass = ReferenceElement.mass(*self.element_bounds)
+
+        local_b = np.einsum("eij,ej->ei", mass, self.source_values())
+        return np.bincount(self.element_basis.ravel(), local_b.ravel(), minlength=len(self.global_b))
+
+    def right_part(self, mass: np.ndarray = None) -> np.ndarray:
+        # правая часть для текущих f и формул краевых при уже собранной матрице (get_slae): матрица не меняется,
+        # 3-и краевые учитываются без матричной части, 1-е - через сохраненный перенос dirichlet_lifting.
+        # Коэффициенты lmbda, gamma и beta должны быть теми же, что и при сборке матрицы
+        self.global_b = self.source_vector(mass)
+        self.account_newton(with_matrix=False)
+        self.account_neumann()
+        self.apply_dirichlet_lifting(*self.dirichlet_values())
+
+        return self.global_b.copy()
+
+    def area_sources(self) -> list[np.ndarray]:
+        # для каждой подобласти - значения ее f в базисных узлах ее элементов (в остальных узлах 0):
+        # f считается один раз в каждом узле, одним вызовом на массиве узлов
+        func_count = len(self.global_b)
+        sources = []
+
+        for area in range(len(self.mesh.materials)):
+            in_area = self.element_areas == area
+            values = np.zeros(func_count)
+
+            if in_area.any():
+                used = np.zeros(func_count, dtype=bool)
+                used[self.element_basis[in_area]] = True
+                nodes = np.flatnonzero(used)
+                values[nodes] = Formula.evaluate_function(self.mesh.materials[area].f,
+                                                          self.basis_r[nodes], self.basis_z[nodes])
+            sources.append(values)
+
+        return sources
+
+    def source_values(self) -> np.ndarray:
+        # значения f в узлах каждого элемента (n_elem, 9)
+        local_f = np.zeros(self.element_basis.shape)
+
+        for area, values in enumerate(self.area_sources()):
+            in_area = self.element_areas == area
+            local_f[in_area] = values[self.element_basis[in_area]]
+
+        return local_f
+
+    def boundary_values(self, conditions: BoundaryConditionArray) -> tuple[np.ndarray, np.ndarray]:
+        # для каждого краевого условия - номера трех базисных функций на его границе и значения условия в них;
+        # каждая формула считается один раз в каждом своем узле
+        borders = np.array(BiquadraticQuadElement.basis_on_borders)
+        nodes = self.element_basis[conditions.elements[:, None], borders[conditions.local_borders]]
+        values = np.zeros(nodes.shape)
+
+        for index in np.flatnonzero(np.bincount(conditions.formula_indices, minlength=len(conditions.formulas))):
+            in_group = conditions.formula_indices == index
+            used = np.zeros(len(self.global_b), dtype=bool)
+            used[nodes[in_group]] = True
+            group_nodes = np.flatnonzero(used)
+
+            node_values = np.zeros(len(self.global_b))
+            node_values[group_nodes] = Formula.evaluate_function(conditions.formulas[index], self.basis_r[group_nodes],
+                                                                 self.basis_z[group_nodes])
+            values[in_group] = node_values[nodes[in_group]]
+
+        return nodes, values
+
+    def dirichlet_values(self) -> tuple[np.ndarray, np.ndarray]:
+        # узлы первого краевого по возрастанию и значения в них;
+        # узел на стыке нескольких границ берет значение первого по порядку условия
+        nodes, values = self.boundary_values(self.mesh.dirichlet)
+        nodes = nodes.ravel()
+        order = np.argsort(nodes, kind="stable")
+        nodes = nodes[order]
+        first = np.concatenate(([True], nodes[1:] != nodes[:-1]))
+
+        return nodes[first], values.ravel()[order][first]
+
+    def dirichlet_nodes(self) -> np.ndarray:
+        # номера базисных функций, на которых задано первое краевое
+        return self.dirichlet_values()[0]
 
     def account_dirichlet(self):
-        # сначала соберем все узлы для первого краевого в одном месте, чтобы проще учитывать
-        all_dirichlet: List[Tuple[int, float]] = []
-        processed_nodes: Set[int] = set()
-
-        for d in self.mesh.dirichlet:
-            element = self.mesh.elements[d.element]
-            basis_by_border = BiquadraticQuadElement.get_basis_by_border(d.local_border)
-
-            for local_basis_index in basis_by_border:
-                global_basis = element.get_global_basis_index(local_basis_index)
+        # строки и столбцы узлов с первым краевым исключаются: на диагональ ставится 1, в правую часть - значение,
+        # а связи с остальными узлами переносятся в правую часть: b_i -= a_ij * u_j
+        nodes, values = self.dirichlet_values()
+        if len(nodes) == 0:
+            return
 
-                # Каждый узел нужно обработать только 1 раз
-                if global_basis in processed_nodes:
-                    continue
-                processed_nodes.add(global_basis)
+        self.dirichlet_lifting = MatrixAssembler.eliminate_dirichlet(self.global_matrix, nodes)
+        self.apply_dirichlet_lifting(nodes, values)
 
-                global_point = element.get_basis_node_position(local_basis_index, lambda idx: self.mesh.points[idx])
+    @staticmethod
+    def eliminate_dirichlet(matrix: SparseMatrix, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # строки и столбцы nodes обнуляются, на диагональ ставится 1; возвращается перенос связей
+        # в правую часть (rows, cols, coefficients): b[rows] -= coefficients * u[cols]
+        f_count = matrix.size
 
-                # на диагональ всегда ставим 1, а в правую часть ставим значение функции
-                all_dirichlet.append((global_basis, d.value(global_point.r, global_point.z)))
+        is_dirichlet = np.zeros(f_count, dtype=bool)
+        is_dirichlet[nodes] = True
 
-        # если обратиться к последнему элементу и к его последней базисной функции, то можно узнать их количество
-        # т.к. мы все пронумеровали последовательно
-        f_count = self.mesh.elements[-1].basis_indices[-1] + 1
-        bc1: List[int] = [-1 for _ in range(f_count)]
+        rows = matrix.rows
+        cols = matrix.jg
+        gg = matrix.gg
 
-        for i in range(len(all_dirichlet)):
-            bc1[all_dirichlet[i][0]] = i
+        # нижний треугольник хранит пары (i, j), i > j; каждая пара дает вклад в строку i и в строку j
+        row_dirichlet = is_dirichlet[rows]
+        col_dirichlet = is_dirichlet[cols]
+        to_row = ~row_dirichlet & col_dirichlet
+        to_col = row_dirichlet & ~col_dirichlet
 
-        for i in range(f_count):
-            if bc1[i] != -1:
-                node, value = all_dirichlet[bc1[i]]
+        # связи сохраняются до обнуления, чтобы учитывать другие значения u без пересборки матрицы
+        lifting = (np.concatenate((rows[to_row], cols[to_col])),
+                   np.concatenate((cols[to_row], rows[to_col])),
+                   np.concatenate((gg[to_row], gg[to_col])))
 
-                self.global_matrix.di[node] = 1.0
-                self.global_b[node] = value
+        gg[row_dirichlet | col_dirichlet] = 0.0
+        matrix.di[nodes] = 1.0
+        return lifting
 
-                for j in range(self.global_matrix.ig[node], self.global_matrix.ig[node + 1]):
-                    k = self.global_matrix.jg[j]
+    def apply_dirichlet_lifting(self, nodes: np.ndarray, values: np.ndarray):
+        MatrixAssembler.lift_dirichlet(self.global_b, self.dirichlet_lifting, nodes, values)
 
-                    if bc1[k] == -1:
-                        self.global_b[k] -= self.global_matrix.gg[j] * self.global_b[node]
+    @staticmethod
+    def lift_dirichlet(vector: np.ndarray, lifting: tuple, nodes: np.ndarray, values: np.ndarray):
+        # учет значений первого краевого в правой части матрицы, из которой они исключены (eliminate_dirichlet)
+        if len(nodes) == 0:
+            return
 
-                    self.global_matrix.gg[j] = 0.0
-            else:
-                for j in range(self.global_matrix.ig[i], self.global_matrix.ig[i + 1]):
-                    k = self.global_matrix.jg[j]
+        f_count = len(vector)
+        u = np.zeros(f_count)
+        u[nodes] = values
 
-                    if bc1[k] != -1:
-                        self.global_b[i] -= self.global_matrix.gg[j] * self.global_b[k]
-                        self.global_matrix.gg[j] = 0.0
+        targets, sources, coefficients = lifting
+        vector -= np.bincount(targets, coefficients * u[sources], minlength=f_count)
+        vector[nodes] = values
 
     def account_neumann(self):
         # если 2х краевых нет, то и учитывать нечего
         if len(self.mesh.neumann) == 0:
             return
 
-        for n in self.mesh.neumann:
+        _, border_values = self.boundary_values(self.mesh.neumann)
+
+        for n, values in zip(self.mesh.neumann, border_values):
             basis_by_border = BiquadraticQuadElement.get_basis_by_border(n.local_border)
             element = self.mesh.elements[n.element]
             border_start = element.get_basis_node_position(basis_by_border[0], lambda idx: self.mesh.points[idx])
@@ -125,116 +406,57 @@ class MatrixAssembler:
                 for i in range(len(basis_by_border)):
                     local_basis = basis_by_border[i]
                     global_basis = element.get_global_basis_index(local_basis)
-                    p = element.get_basis_node_position(local_basis, lambda idx: self.mesh.points[idx])
                     f = lambda z: Basis.psi_1d(i, zk, zk1, z)
-                    self.global_b[global_basis] += rk * n.value(p.r, p.z) * Integrator.integration1D(f, zk, zk1)
+                    self.global_b[global_basis] += rk * values[i] * Integrator.integration1D(f, zk, zk1)
             # нижняя или верхняя
             else:
                 for i in range(len(basis_by_border)):
                     local_basis = basis_by_border[i]
                     global_basis = element.get_global_basis_index(local_basis)
-                    p = element.get_basis_node_position(local_basis, lambda idx: self.mesh.points[idx])
 
                     # здесь еще в начале идет умножение на r, т.к это якобиан, при этом по горизонтальной оси изменяется r.
                     # поэтому нужно внести его под интеграл
                     f = lambda r: r * Basis.psi_1d(i, rk, rk1, r)
-                    self.global_b[global_basis] += n.value(p.r, p.z) * Integrator.integration1D(f, rk, rk1)
+                    self.global_b[global_basis] += values[i] * Integrator.integration1D(f, rk, rk1)
 
-    def account_newton(self):
+    def account_newton(self, with_matrix: bool = True):
+        # with_matrix=False - только вклад в правую часть (матрица уже собрана с теми же beta)
         # если 3х краевых нет, то и учитывать нечего
-        if len(self.mesh.newton) == 0:
+        conditions = self.mesh.newton
+        if len(conditions) == 0:
             return
 
-        total_local_mass_matrix = Matrix(3, 3)
-        flow_vector = [0.0, 0.0, 0.0]
-        local_vector = [0.0, 0.0, 0.0]
+        # локальные матрицы beta * int r psi_i psi_j для всех сторон сразу (m, 3, 3)
+        elements = conditions.elements
+        bounds = tuple(bound[elements] for bound in self.element_bounds)
+        local_matrices = conditions.betas[:, None, None] * ReferenceElement.edge_mass(conditions.local_borders, *bounds)
 
-        for n in self.mesh.newton:
-            basis_by_border = BiquadraticQuadElement.get_basis_by_border(n.local_border)
-            element = self.mesh.elements[n.element]
-            border_start = element.get_basis_node_position(basis_by_border[0], lambda idx: self.mesh.points[idx])
-            border_end = element.get_basis_node_position(basis_by_border[2], lambda idx: self.mesh.points[idx])
-            beta = n.beta
-            rk = border_start.r
-            rk1 = border_end.r
-            zk = border_start.z
-            zk1 = border_end.z
+        nodes, values = self.boundary_values(conditions)
+        func_count = len(self.global_b)
+        self.global_b += np.bincount(nodes.ravel(), np.einsum("mij,mj->mi", local_matrices, values).ravel(),
+                                     minlength=func_count)
 
-            for i in range(3):
-                local_basis = basis_by_border[i]
-                p = element.get_basis_node_position(local_basis, lambda idx: self.mesh.points[idx])
-                flow_vector[i] = n.value(p.r, p.z)
+        if not with_matrix:
+            return
 
-            # левая или правая граница
-            if n.local_border == 1 or n.local_border == 2:
-                for i in range(3):
-                    for j in range(i + 1):
-                        f = lambda z: Basis.psi_1d(i, zk, zk1, z) * Basis.psi_1d(j, zk, zk1, z)
-                        val = beta * rk * Integrator.integration1D(f, zk, zk1)
-                        total_local_mass_matrix[i, j] = val
-                        total_local_mass_matrix[j, i] = val
-            # нижняя или верхняя
-            else:
-                for i in range(3):
-                    for j in range(i + 1):
-                        f = lambda r: r * Basis.psi_1d(i, rk, rk1, r) * Basis.psi_1d(j, rk, rk1, r)
-                        val = beta * Integrator.integration1D(f, rk, rk1)
-                        total_local_mass_matrix[i, j] = val
-                        total_local_mass_matrix[j, i] = val
+        # позиции в gg - из карты сборки элемента, к которому относится сторона
+        borders = np.array(BiquadraticQuadElement.basis_on_borders)[conditions.local_borders]
+        offsets = self.scatter_map[elements[:, None, None], borders[:, :, None], borders[:, None, :]]
+        lower = nodes[:, :, None] > nodes[:, None, :]
+
+        matrix = self.global_matrix
+        matrix.gg += np.bincount(offsets[lower], local_matrices[lower], minlength=len(self.jg))
+        matrix.di += np.bincount(nodes.ravel(), np.einsum("mii->mi", local_matrices).ravel(), minlength=func_count)
 
-            local_vector = Matrix.dot(total_local_mass_matrix, flow_vector)
+    def assemble_local_slae(self, ielem: int):
+        rk, rk1, zk, zk1 = (float(bound[ielem]) for bound in self.element_bounds)
 
-            for i in range(3):
-                global_i = element.get_global_basis_index(basis_by_border[i])
-                self.global_b[global_i] += local_vector[i]
+        # локальные матрицы жесткости G и масс M собираются из таблиц эталонного элемента
+        self.G = ReferenceElement.stiffness(rk, rk1, zk, zk1)
+        self.M = ReferenceElement.mass(rk, rk1, zk, zk1)
 
-                for j in range(i + 1):
-                    global_j = element.get_global_basis_index(basis_by_border[j])
-                    self.global_matrix.add(global_i, global_j, total_local_mass_matrix[i, j])
+        if self.element_f is None:
+            self.element_f = self.source_values()
+        self.local_f = self.element_f[ielem]
 
-    def assemble_local_slae(self, ielem: int):
-        element = self.mesh.elements[ielem]
-
-        p0 = self.mesh.points[element.physical_nodes_indices[0]]
-        p2 = self.mesh.points[element.physical_nodes_indices[-1]]
-
-        rk = p0.r
-        zk = p0.z
-        rk1 = p2.r
-        zk1 = p2.z
-
-        # локальная матрица жесткости G
-        for i in range(9):
-            for j in range(i + 1):
-                def f(r: float, z: float):
-                    dpsi_i_r = Basis.d_psi(self.mesh, ielem, i, r, z, "r")
-                    dpsi_j_r = Basis.d_psi(self.mesh, ielem, j, r, z, "r")
-                    dpsi_i_z = Basis.d_psi(self.mesh, ielem, i, r, z, "z")
-                    dpsi_j_z = Basis.d_psi(self.mesh, ielem, j, r, z, "z")
-                    return (dpsi_i_r * dpsi_j_r + dpsi_i_z * dpsi_j_z) * r
-
-                integral = Integrator.integration2D(f, rk, rk1, zk, zk1)
-                self.G[i, j] = integral
-                self.G[j, i] = integral
-
-        # локальная матрица масс M
-        for i in range(9):
-            for j in range(i + 1):
-                def f(r: float, z: float):
-                    psi_i = Basis.psi(self.mesh, ielem, i, r, z)
-                    psi_j = Basis.psi(self.mesh, ielem, j, r, z)
-                    return psi_i * psi_j * r
-
-                integral = Integrator.integration2D(f, rk, rk1, zk, zk1)
-                self.M[i, j] = integral
-                self.M[j, i] = integral
-
-        f = self.mesh.materials[self.mesh.elements[ielem].area_number].f
-        for i in range(9):
-            point_i = element.get_basis_node_position(i, lambda idx: self.mesh.points[idx])
-            self.local_f[i] = f(point_i.r, point_i.z)
-
-        for i in range(9):
-            self.local_b[i] = 0.0
-            for j in range(9):
-                self.local_b[i] += self.M[i, j] * self.local_f[j]
+        self.local_b = self.M @ self.local_f
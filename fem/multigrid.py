@@ -0,0 +1,216 @@
+import copy
+import time
+import numpy as np
+
+from mesh.mesh_parameters import MeshParameters
+from mesh.mesh_builder import MeshBuilder
+from portrait.numerator import Numerator
+from portrait.portrait_builder import PortraitBuilder
+from fem.matrix_assembler import MatrixAssembler
+from fem.reference_element import ReferenceElement
+from fem.sparse_matrix import SparseMatrix
+from fem.preconditioner import Preconditioner, JacobiPreconditioner, SsorPreconditioner
+from fem.ldlt import Ldlt
+
+class MultigridLevel:
+    def __init__(self, matrix: SparseMatrix, dirichlet: np.ndarray, r_line: np.ndarray, z_line: np.ndarray,
+                 smoother: Preconditioner):
+        self.matrix = matrix
+        self.dirichlet = dirichlet
+        self.smoother = smoother
+        self.smoother.build(matrix)
+        # координаты узлов базисных функций вдоль осей: на прямоугольной сетке
+        # функция с номером iz * len(r_line) + ir находится в точке (r_line[ir], z_line[iz])
+        self.r_line = r_line
+        self.z_line = z_line
+        self.residual = np.empty(matrix.size)
+        self.correction = np.empty(matrix.size)
+
+
+class Multigrid(Preconditioner):
+    # Геометрический многосеточный метод на сетках MeshBuilder уровней 0..refinement.
+    # Уровни вложены: каждое измельчение делит элементы пополам, поэтому биквадратичные функции
+    # грубой сетки точно представляются на мелкой, и продолжение P - интерполяция в узлах мелкой сетки,
+    # а сужение - P^T. Сглаживатель - SSOR (по умолчанию) или затухающий Якоби (на сгущающихся сетках с вытянутыми
+    # элементами точечный Якоби сглаживает заметно хуже), на самой грубой сетке - прямое решение Ldlt.
+    # Используется как предобуславливатель Los (один V-цикл) или как самостоятельный решатель (compute)
+    name = "multigrid"
+
+    def __init__(self, parameters: MeshParameters, smoothing_steps: int = 2, omega: float = None,
+                 smoother: str = "ssor", max_iterations: int = 100, eps: float = 1e-12):
+        self.parameters = parameters
+        self.smoother = smoother
+        self.smoothing_steps = smoothing_steps
+        # затухание поправки сглаживателя: для Якоби 0.6, SSOR симметричен и используется без затухания
+        self.omega = omega if omega is not None else (1.0 if smoother == "ssor" else 0.6)
+        self.max_iterations = max_iterations
+        # самостоятельный решатель останавливается при ||b - Ax|| / ||b|| < eps, как Los
+        self.eps = eps
+
+        self.levels: list[MultigridLevel] = []
+        # для каждой пары уровней (l - 1, l) - одномерные продолжения по r и по z
+        self.transfers: list[tuple] = []
+        self.coarse_solver = Ldlt()
+
+        self.solution = np.zeros(0)
+        self.iterations_count: int = 0
+        self.residual_history: list[float] = []
+        self.build_time: float = 0.0
+        self.elapsed_time: float = 0.0
+
+    def build(self, matrix: SparseMatrix):
+        start = time.perf_counter()
+        finest = self.parameters.refinement
+        self.levels = []
+
+        for level in range(finest + 1):
+            level_parameters = copy.deepcopy(self.parameters)
+            level_parameters.refinement = level
+
+            mesh_builder = MeshBuilder(level_parameters)
+            mesh_builder.create_points()
+            mesh_builder.create_elements()
+            mesh_builder.create_boundaries()
+            mesh = mesh_builder.get_mesh()
+            Numerator.numerate_basis_functions(mesh)
+
+            assembler = MatrixAssembler(mesh)
+            nx = int(mesh.elements.corners[0, 2])
+            if not PortraitBuilder.is_structured(assembler.element_basis, nx):
+                raise Exception("Multigrid requires a structured mesh")
+
+            if level == finest:
+                if matrix.size != len(assembler.global_b):
+                    raise Exception("Size of matrix does not match the finest multigrid level")
+                level_matrix = matrix
+            else:
+                level_matrix, _ = assembler.get_slae()
+
+            row_size = 2 * nx - 1
+            smoother = SsorPreconditioner(1.0) if self.smoother == "ssor" else JacobiPreconditioner()
+            self.levels.append(MultigridLevel(level_matrix, assembler.dirichlet_nodes(),
+                                              assembler.basis_r[:row_size], assembler.basis_z[::row_size], smoother))
+
+        self.transfers = [
+            (Multigrid.prolongation_1d(coarse.r_line, fine.r_line),
+             Multigrid.prolongation_1d(coarse.z_line, fine.z_line))
+            for coarse, fine in zip(self.levels[:-1], self.levels[1:])
+        ]
+
+        self.coarse_solver.factorize(self.levels[0].matrix)
+        self.build_time = time.perf_counter() - start
+
+    @staticmethod
+    def prolongation_1d(coarse_line: np.ndarray, fine_line: np.ndarray):
+        # значение в узле fine_line[i] = sum_a weights[i, a] * значение в узле coarse_line[indices[i, a]]
+        element_bounds = coarse_line[::2]
+        elements_count = len(element_bounds) - 1
+
+        element = np.clip(np.searchsorted(element_bounds, fine_line, side="right") - 1, 0, elements_count - 1)
+        left = element_bounds[element]
+        right = element_bounds[element + 1]
+
+        indices = 2 * element[:, None] + np.arange(3)
+        weights = ReferenceElement.psi_1d((fine_line - left) / (right - left)).T
+
+        # транспонированная таблица для сужения: для каждого грубого узла - список (мелкий узел, вес),
+        # дополненный нулевыми весами до одинаковой длины
+        coarse = indices.ravel()
+        order = np.argsort(coarse, kind="stable")
+        counts = np.bincount(coarse, minlength=len(coarse_line))
+        slot = np.arange(len(coarse)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        transposed_indices = np.zeros((len(coarse_line), counts.max()), dtype=np.int64)
+        transposed_weights = np.zeros((len(coarse_line), counts.max()))
+        transposed_indices[coarse[order], slot] = np.repeat(np.arange(len(fine_line)), 3)[order]
+        transposed_weights[coarse[order], slot] = weights.ravel()[order]
+
+        return indices, weights, transposed_indices, transposed_weights
+
+    @staticmethod
+    def prolongate(coarse_vector: np.ndarray, transfer_r, transfer_z):
+        indices_r, weights_r = transfer_r[0], transfer_r[1]
+        indices_z, weights_z = transfer_z[0], transfer_z[1]
+
+        u = coarse_vector.reshape(len(transfer_z[2]), len(transfer_r[2]))
+        u = (u[:, indices_r] * weights_r).sum(axis=2)
+        u = (u[indices_z] * weights_z[:, :, None]).sum(axis=1)
+        return u.ravel()
+
+    @staticmethod
+    def restrict(fine_vector: np.ndarray, transfer_r, transfer_z):
+        indices_r, weights_r = transfer_r[2], transfer_r[3]
+        indices_z, weights_z = transfer_z[2], transfer_z[3]
+
+        u = fine_vector.reshape(len(transfer_z[0]), len(transfer_r[0]))
+        u = (u[:, indices_r] * weights_r).sum(axis=2)
+        u = (u[indices_z] * weights_z[:, :, None]).sum(axis=1)
+        return u.ravel()
+
+    def smooth(self, level: MultigridLevel, right_part: np.ndarray, x: np.ndarray):
+        for _ in range(self.smoothing_steps):
+            level.matrix.dot(x, level.residual)
+            np.subtract(right_part, level.residual, out=level.residual)
+            level.smoother.apply(level.residual, level.correction)
+            level.correction *= self.omega
+            x += level.correction
+
+    def v_cycle(self, index: int, right_part: np.ndarray) -> np.ndarray:
+        if index == 0:
+            return self.coarse_solver.solve(right_part)
+
+        level = self.levels[index]
+        coarse = self.levels[index - 1]
+        transfer_r, transfer_z = self.transfers[index - 1]
+
+        x = np.zeros(level.matrix.size)
+        self.smooth(level, right_part, x)
+
+        level.matrix.dot(x, level.residual)
+        np.subtract(right_part, level.residual, out=level.residual)
+        level.residual[level.dirichlet] = 0.0
+        coarse_right_part = Multigrid.restrict(level.residual, transfer_r, transfer_z)
+        coarse_right_part[coarse.dirichlet] = 0.0
+
+        correction = Multigrid.prolongate(self.v_cycle(index - 1, coarse_right_part), transfer_r, transfer_z)
+        correction[level.dirichlet] = 0.0
+        x += correction
+
+        self.smooth(level, right_part, x)
+        return x
+
+    def apply(self, vector: np.ndarray, out: np.ndarray):
+        out[:] = self.v_cycle(len(self.levels) - 1, vector)
+        return out
+
+    def compute(self, matrix: SparseMatrix, right_part):
+        # самостоятельный решатель: x += V(b - Ax), пока относительная невязка не станет меньше eps;
+        # если за max_iterations циклов этого не произошло - исключение (решение остается в solution)
+        start = time.perf_counter()
+        self.build(matrix)
+
+        right_part = np.asarray(right_part, dtype=float)
+        self.solution = np.zeros(len(right_part))
+        residual = np.empty(len(right_part))
+        self.residual_history = []
+
+        right_part_norm = float(np.linalg.norm(right_part))
+        scale = right_part_norm if right_part_norm > 0.0 else 1.0
+
+        for self.iterations_count in range(self.max_iterations + 1):
+            matrix.dot(self.solution, residual)
+            np.subtract(right_part, residual, out=residual)
+            relative = float(np.linalg.norm(residual)) / scale
+            self.residual_history.append(relative)
+
+            if relative < self.eps:
+                break
+
+            if self.iterations_count == self.max_iterations:
+                self.elapsed_time = time.perf_counter() - start
+                raise Exception(f"Multigrid did not converge in {self.max_iterations} cycles: "
+                                f"relative residual {relative:.2e}")
+
+            self.solution += self.v_cycle(len(self.levels) - 1, residual)
+
+        self.elapsed_time = time.perf_counter() - start
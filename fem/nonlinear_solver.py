@@ -0,0 +1,245 @@
+import numpy as np
+
+from mesh.mesh import Mesh
+from mesh.formula import Formula
+from fem.fem_solver import FemSolver
+from fem.matrix_assembler import MatrixAssembler
+from fem.los import Los
+from fem.preconditioner import LdltPreconditioner
+from fem.reference_element import ReferenceElement
+from fem.sparse_matrix import SparseMatrix
+from fem.solve_report import SolveReport
+
+class JacobianOperator:
+    # Матрица Якоби без сборки глобальной несимметричной матрицы: J v = A(u) v + sum_e C_e v_e, где
+    # C_e[i, j] = sum_q phi_j(q) * (lmbda'(u_q) * (G_q u_e)_i + gamma'(u_q) * (M_q u_e)_i) - производная
+    # коэффициентов в точках квадратуры q. Строки и столбцы узлов 1-х краевых - единичные,
+    # как в матрице с исключенными краевыми
+    def __init__(self, matrix: SparseMatrix, element_basis: np.ndarray, couplings: np.ndarray, dirichlet: np.ndarray):
+        self.matrix = matrix
+        self.size = matrix.size
+        self.element_basis = element_basis
+        self.couplings = couplings
+        self.dirichlet = dirichlet
+
+    def dot(self, vector, product=None):
+        vector = np.asarray(vector, dtype=float)
+        free = vector.copy()
+        free[self.dirichlet] = 0.0
+
+        result = self.matrix.dot(free)
+        local = np.einsum("eij,ej->ei", self.couplings, free[self.element_basis])
+        result += np.bincount(self.element_basis.ravel(), local.ravel(), minlength=self.size)
+        result[self.dirichlet] = vector[self.dirichlet]
+
+        if product is None:
+            return result
+        product[:] = result
+        return product
+
+
+class NonlinearSolver(FemSolver):
+    # Задача -div(lmbda(u) grad u) + gamma(u) u = f: lmbda и gamma подобластей - числа или функции u (Formula от u).
+    # Сетка, нумерация, портрет и карта сборки строятся один раз (FemSolver), правая часть, 3-и краевые
+    # и узлы 1-х краевых - один раз перед итерациями. На каждой внешней итерации пересобираются только
+    # значения матрицы (assemble_point_matrix) с коэффициентами в 25 точках квадратуры Гаусса каждого элемента,
+    # поэтому точность биквадратичных элементов та же, что и в линейной задаче.
+    #   "picard" - A(u_k) v = b, u_k+1 = u_k + relaxation * (v - u_k), Los стартует с u_k;
+    #   "newton" - J(u_k) du = b - A(u_k) u_k, u_k+1 = u_k + relaxation * du; J применяется без сборки
+    #              (JacobianOperator) и обращается Los с предобуславливателем, построенным по A(u_k)
+    #              (по умолчанию - LdltPreconditioner). Область сходимости Ньютона мала, поэтому, пока относительная
+    #              невязка не меньше newton_switch, после шага Ньютона она выросла или Los не сошелся
+    #              за newton_iterations итераций, делается шаг Пикара.
+    # Внутренние решения неточные: невязка линейной системы уменьшается в 1 / forcing раз, для Пикара
+    # forcing = 0.1 (сходимость линейная, более точное решение не ускоряет внешние итерации),
+    # для Ньютона forcing = min(0.1, sqrt(относительная невязка)) - сверхлинейная сходимость.
+    # Сходимость - по относительной невязке ||b - A(u) u|| / ||b||, история - в report.nonlinear_history
+    methods = ("picard", "newton")
+    picard_forcing = 0.1
+
+    def __init__(self, mesh: Mesh, method: str = "picard", relaxation: float = 1.0, max_nonlinear_iterations: int = 50,
+                 tolerance: float = 1e-10, initial: np.ndarray = None, newton_switch: float = 1e-2,
+                 newton_iterations: int = 100, **kwargs):
+        if method not in NonlinearSolver.methods:
+            raise Exception(f"Unknown nonlinear method: {method}")
+
+        if method == "newton" and kwargs.get("solver") is None and kwargs.get("preconditioner") is None:
+            # без предобуславливания Los на несимметричной матрице Якоби почти не сходится
+            kwargs["preconditioner"] = LdltPreconditioner()
+
+        super().__init__(mesh, **kwargs)
+
+        if method == "newton" and not isinstance(self.solver, Los):
+            raise Exception("Newton method requires Los solver")
+
+        self.method = method
+        self.relaxation = relaxation
+        self.max_nonlinear_iterations = max_nonlinear_iterations
+        self.tolerance = tolerance
+        self.newton_switch = newton_switch
+        self.newton_iterations = newton_iterations
+        # начальное приближение в базисных узлах, например решение предыдущей задачи; по умолчанию 0
+        self.initial = initial
+        # матрица до учета 1-х краевых (для матрицы Якоби)
+        self.full_matrix = SparseMatrix(self.matrix_assembler.ig, self.matrix_assembler.jg)
+        # от u не зависят: правая часть и матричная часть 3-х краевых до учета 1-х краевых, узлы и значения 1-х
+        self.boundary_di = np.zeros(0)
+        self.boundary_gg = np.zeros(0)
+        self.stationary_b = np.zeros(0)
+        self.dirichlet = (np.zeros(0, dtype=int), np.zeros(0))
+
+    @staticmethod
+    def coefficient_values(coefficient, u: np.ndarray) -> np.ndarray:
+        if not callable(coefficient):
+            return np.full(len(u), float(coefficient))
+        if hasattr(coefficient, "evaluate"):
+            return coefficient.evaluate(u)
+        return Formula.evaluate_pointwise(coefficient, u)
+
+    @staticmethod
+    def coefficient_derivative(coefficient, u: np.ndarray) -> np.ndarray:
+        # центральная разность
+        if not callable(coefficient):
+            return np.zeros(len(u))
+
+        step = 1e-7 * (1.0 + np.abs(u))
+        return (NonlinearSolver.coefficient_values(coefficient, u + step) -
+                NonlinearSolver.coefficient_values(coefficient, u - step)) / (2.0 * step)
+
+    def point_coefficients(self, u: np.ndarray, derivatives: bool = False) -> list[np.ndarray]:
+        # lmbda, gamma (или их производные по u) в точках квадратуры каждого элемента (n_elem, 25)
+        assembler = self.matrix_assembler
+        point_values = u[assembler.element_basis] @ ReferenceElement.psi_points
+        evaluate = NonlinearSolver.coefficient_derivative if derivatives else NonlinearSolver.coefficient_values
+
+        lmbda = np.zeros(point_values.shape)
+        gamma = np.zeros(point_values.shape)
+        for area, material in enumerate(self.mesh.materials):
+            in_area = assembler.element_areas == area
+            values = point_values[in_area].ravel()
+            lmbda[in_area] = evaluate(material.lmbda, values).reshape(-1, 25)
+            gamma[in_area] = evaluate(material.gamma, values).reshape(-1, 25)
+
+        return [lmbda, gamma]
+
+    def prepare(self):
+        # b (f, 2-е и 3-и краевые) и матричная часть 3-х краевых от u не зависят
+        assembler = self.matrix_assembler
+        assembler.global_matrix.clear()
+        assembler.global_b = assembler.source_vector()
+        assembler.account_newton()
+        assembler.account_neumann()
+
+        self.boundary_di = assembler.global_matrix.di.copy()
+        self.boundary_gg = assembler.global_matrix.gg.copy()
+        self.stationary_b = assembler.global_b.copy()
+        self.dirichlet = assembler.dirichlet_values()
+
+    def assemble_at(self, u: np.ndarray):
+        # A(u) и b: полная матрица (с 3-ми краевыми) сохраняется в full_matrix, затем исключаются 1-е краевые
+        assembler = self.matrix_assembler
+        assembler.assemble_point_matrix(*self.point_coefficients(u))
+
+        matrix = assembler.global_matrix
+        matrix.di += self.boundary_di
+        matrix.gg += self.boundary_gg
+        self.full_matrix.di[:] = matrix.di
+        self.full_matrix.gg[:] = matrix.gg
+
+        nodes, values = self.dirichlet
+        assembler.global_b = self.stationary_b.copy()
+        if len(nodes) > 0:
+            assembler.dirichlet_lifting = MatrixAssembler.eliminate_dirichlet(matrix, nodes)
+            assembler.apply_dirichlet_lifting(nodes, values)
+
+        return matrix, assembler.global_b
+
+    def jacobian(self, u: np.ndarray) -> JacobianOperator:
+        assembler = self.matrix_assembler
+        d_lmbda, d_gamma = self.point_coefficients(u, derivatives=True)
+
+        # вклады точек квадратуры в G_e u_e и M_e u_e: (n_elem, 25, 9)
+        bounds = assembler.element_bounds
+        element_u = u[assembler.element_basis]
+        sensitivities = (d_lmbda[:, :, None] * ReferenceElement.stiffness_point_products(element_u, *bounds)
+                         + d_gamma[:, :, None] * ReferenceElement.mass_point_products(element_u, *bounds))
+        couplings = np.einsum("eqi,jq->eij", sensitivities, ReferenceElement.psi_points)
+
+        return JacobianOperator(self.full_matrix, assembler.element_basis, couplings, self.dirichlet[0])
+
+    def inexact_compute(self, matrix, right_part: np.ndarray, eps: float, initial: np.ndarray = None,
+                        build_preconditioner: bool = True, max_iterations: int = None) -> bool:
+        # решение Los с относительной точностью eps (но не точнее собственной eps решателя);
+        # False - точность не достигнута за max_iterations итераций
+        solver = self.solver
+        solver_eps, solver_iterations = solver.eps, solver.max_iterations
+        solver.eps = max(solver_eps, eps)
+        if max_iterations is not None:
+            solver.max_iterations = min(solver_iterations, max_iterations)
+        try:
+            solver.compute(matrix, right_part, initial=initial, build_preconditioner=build_preconditioner)
+            return solver.residual_history[-1] < solver.eps
+        finally:
+            solver.eps, solver.max_iterations = solver_eps, solver_iterations
+
+    def picard_step(self, u: np.ndarray, matrix: SparseMatrix, vector: np.ndarray,
+                    relative_residual: float) -> np.ndarray:
+        # Los стартует с u_k, его начальная невязка ||b - A u_k|| / ||b|| - внешняя невязка
+        if isinstance(self.solver, Los):
+            self.inexact_compute(matrix, vector, NonlinearSolver.picard_forcing * relative_residual, initial=u)
+        else:
+            self.solver.compute(matrix, vector)
+        return u + self.relaxation * (np.array(self.solver.solution) - u)
+
+    def newton_step(self, u: np.ndarray, matrix: SparseMatrix, residual: np.ndarray,
+                    relative_residual: float) -> np.ndarray | None:
+        # du начинается с 0, поэтому точность задается относительно ||residual||; None - Los не сошелся
+        self.solver.preconditioner.build(matrix)
+        converged = self.inexact_compute(self.jacobian(u), residual, min(0.1, np.sqrt(relative_residual)),
+                                         build_preconditioner=False, max_iterations=self.newton_iterations)
+        if not converged:
+            return None
+        return u + self.relaxation * self.solver.solution
+
+    def solve(self) -> SolveReport:
+        with self.report.phase("assembly"):
+            self.prepare()
+
+        nodes, values = self.dirichlet
+        u = np.zeros(len(self.stationary_b)) if self.initial is None else np.array(self.initial, dtype=float)
+        u[nodes] = values
+
+        history = []
+        linear_iterations = 0
+
+        for iteration in range(self.max_nonlinear_iterations + 1):
+            with self.report.phase("assembly"):
+                matrix, vector = self.assemble_at(u)
+
+            vector_norm = np.linalg.norm(vector)
+            residual = vector - matrix.dot(u)
+            history.append(float(np.linalg.norm(residual) / vector_norm) if vector_norm > 0.0
+                           else float(np.linalg.norm(residual)))
+
+            if history[-1] < self.tolerance or iteration == self.max_nonlinear_iterations:
+                break
+
+            with self.report.phase("solve"):
+                step = None
+                if (self.method == "newton" and history[-1] < self.newton_switch and
+                        (len(history) == 1 or history[-1] < history[-2])):
+                    step = self.newton_step(u, matrix, residual, history[-1])
+                    linear_iterations += self.solver.iterations_count
+
+                if step is None:
+                    step = self.picard_step(u, matrix, vector, history[-1])
+                    linear_iterations += self.solver.iterations_count
+                u = step
+
+        self.solver.solution = u
+        self.report.record_solver(self.solver, matrix, vector, u)
+        self.report.iterations_count = linear_iterations
+        self.report.nonlinear_history = history
+
+        self.save_results()
+        return self.report
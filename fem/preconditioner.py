@@ -0,0 +1,183 @@
+import numpy as np
+
+from fem.sparse_matrix import SparseMatrix
+from fem.ldlt import Ldlt
+
+class Preconditioner:
+    # Предобуславливатель для Los: build строит M по матрице системы, apply считает out = M^-1 * vector
+    name = "none"
+
+    def build(self, matrix: SparseMatrix):
+        pass
+
+    def apply(self, vector: np.ndarray, out: np.ndarray):
+        out[:] = vector
+        return out
+
+
+class JacobiPreconditioner(Preconditioner):
+    name = "jacobi"
+
+    def __init__(self):
+        self.inverse_diagonal = np.zeros(0)
+
+    def build(self, matrix: SparseMatrix):
+        self.inverse_diagonal = 1.0 / np.asarray(matrix.di, dtype=float)
+
+    def apply(self, vector: np.ndarray, out: np.ndarray):
+        return np.multiply(vector, self.inverse_diagonal, out=out)
+
+
+class SsorPreconditioner(Preconditioner):
+    # M = w / (2 - w) * (D / w + L) * (D / w)^-1 * (D / w + L^T)
+    name = "ssor"
+
+    def __init__(self, omega: float = 1.0):
+        self.omega = omega
+        self.solver = None
+        self.scaled_diagonal = np.zeros(0)
+        self.work = np.zeros(0)
+
+    def build(self, matrix: SparseMatrix):
+        self.scaled_diagonal = np.asarray(matrix.di, dtype=float) / self.omega
+        self.solver = TriangularSolver(matrix.ig, matrix.jg, matrix.gg, self.scaled_diagonal)
+        self.work = np.empty(matrix.size)
+
+    def apply(self, vector: np.ndarray, out: np.ndarray):
+        self.solver.solve_lower(vector, self.work)
+        self.work *= self.scaled_diagonal
+        self.solver.solve_upper(self.work, out)
+        out *= (2.0 - self.omega) / self.omega
+        return out
+
+
+class IncompleteCholeskyPreconditioner(Preconditioner):
+    # IC(0): M = L * L^T, где L имеет тот же профиль ig/jg, что и нижний треугольник матрицы
+    name = "ic0"
+
+    def __init__(self):
+        self.solver = None
+        self.work = np.zeros(0)
+
+    def build(self, matrix: SparseMatrix):
+        ig = np.asarray(matrix.ig)
+        jg = np.asarray(matrix.jg)
+        di = np.asarray(matrix.di, dtype=float)
+        gg = np.asarray(matrix.gg, dtype=float)
+
+        n = len(di)
+        lower = np.zeros(len(gg))
+        diagonal = np.zeros(n)
+
+        # строка i раскладывается в плотный буфер, чтобы скалярные произведения строк i и j
+        # брались только по общему профилю
+        row_buffer = np.zeros(n)
+
+        for i in range(n):
+            begin, end = ig[i], ig[i + 1]
+            cols = jg[begin:end]
+            sum_diagonal = di[i]
+
+            for k in range(begin, end):
+                j = jg[k]
+                j_begin, j_end = ig[j], ig[j + 1]
+                s = lower[j_begin:j_end] @ row_buffer[jg[j_begin:j_end]]
+                lower[k] = (gg[k] - s) / diagonal[j]
+                row_buffer[j] = lower[k]
+                sum_diagonal -= lower[k] * lower[k]
+
+            if sum_diagonal <= 0.0:
+                raise Exception(f"Incomplete Cholesky breakdown in row {i}")
+
+            diagonal[i] = np.sqrt(sum_diagonal)
+            row_buffer[cols] = 0.0
+
+        self.solver = TriangularSolver(ig, jg, lower, diagonal)
+        self.work = np.empty(n)
+
+    def apply(self, vector: np.ndarray, out: np.ndarray):
+        self.solver.solve_lower(vector, self.work)
+        self.solver.solve_upper(self.work, out)
+        return out
+
+
+class LdltPreconditioner(Preconditioner):
+    # M = A: точное разложение Ldlt симметричной матрицы. Для Los с близкой к A несимметричной матрицей
+    # (матрица Якоби в методе Ньютона) - M^-1 J отличается от E малым возмущением
+    name = "ldlt"
+
+    def __init__(self):
+        self.solver = Ldlt()
+
+    def build(self, matrix: SparseMatrix):
+        self.solver.factorize(matrix)
+
+    def apply(self, vector: np.ndarray, out: np.ndarray):
+        out[:] = self.solver.solve(vector)
+        return out
+
+
+class TriangularSolver:
+    # Решение систем с L и L^T, где L задана профилем ig/jg, внедиагональными values и диагональю diagonal.
+    # Строки разбиты на уровни: строка зависит только от строк предыдущих уровней,
+    # поэтому все строки одного уровня считаются одной векторной операцией
+    def __init__(self, ig, jg, values, diagonal):
+        ig = np.asarray(ig)
+        jg = np.asarray(jg)
+        values = np.asarray(values, dtype=float)
+        diagonal = np.asarray(diagonal, dtype=float)
+
+        n = len(diagonal)
+        rows = np.repeat(np.arange(n), np.diff(ig))
+
+        level = np.zeros(n, dtype=np.int64)
+        for i in range(n):
+            begin, end = ig[i], ig[i + 1]
+            if end > begin:
+                level[i] = level[jg[begin:end]].max() + 1
+
+        # прямой ход идет по строкам L, обратный - по столбцам L (строкам L^T) в обратном порядке уровней
+        self.forward = TriangularSolver.split_by_level(level, rows, jg, values, diagonal)
+        self.backward = TriangularSolver.split_by_level(level, jg, rows, values, diagonal)[::-1]
+
+    @staticmethod
+    def split_by_level(level, entry_nodes, entry_sources, values, diagonal):
+        # для каждого уровня: узлы уровня, откуда брать уже найденные значения, коэффициенты,
+        # номер узла внутри уровня для каждого элемента и диагональ
+        levels_count = int(level.max()) + 1 if len(level) > 0 else 0
+
+        node_order = np.argsort(level, kind="stable")
+        node_bounds = np.searchsorted(level[node_order], np.arange(levels_count + 1))
+
+        entry_level = level[entry_nodes]
+        entry_order = np.argsort(entry_level, kind="stable")
+        entry_bounds = np.searchsorted(entry_level[entry_order], np.arange(levels_count + 1))
+
+        position = np.empty(len(level), dtype=np.int64)
+        groups = []
+
+        for l in range(levels_count):
+            nodes = node_order[node_bounds[l]:node_bounds[l + 1]]
+            position[nodes] = np.arange(len(nodes))
+            entries = entry_order[entry_bounds[l]:entry_bounds[l + 1]]
+            groups.append((nodes, entry_sources[entries], values[entries],
+                           position[entry_nodes[entries]], diagonal[nodes]))
+
+        return groups
+
+    @staticmethod
+    def substitute(groups, vector: np.ndarray, out: np.ndarray):
+        out[:] = vector
+
+        for nodes, sources, values, local_nodes, diagonal in groups:
+            if len(sources) > 0:
+                out[nodes] -= np.bincount(local_nodes, values * out[sources], minlength=len(nodes))
+            out[nodes] /= diagonal
+
+        return out
+
+    def solve_lower(self, vector: np.ndarray, out: np.ndarray):
+        return TriangularSolver.substitute(self.forward, vector, out)
+
+    def solve_upper(self, vector: np.ndarray, out: np.ndarray):
+        return TriangularSolver.substitute(self.backward, vector, out)
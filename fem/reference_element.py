@@ -0,0 +1,157 @@
+import numpy as np
+
+from fem.gauss import Gauss
+
+class ReferenceElement:
+    # Биквадратичные базисные функции на эталонном квадрате [0,1]x[0,1].
+    # Локальный номер i = 3 * b + a, где a - номер одномерной функции по r, b - по z.
+    # В осесимметричной постановке вес r = rk + hr * xi раскладывается на постоянную и линейную части,
+    # поэтому локальные G и M - это линейные комбинации нескольких таблиц 9x9, посчитанных один раз.
+    # Для коэффициентов, заданных в 25 точках квадратуры (например, зависящих от решения), таблицы хранятся
+    # и по отдельным точкам: (25, 9, 9), их сумма по точкам - таблицы для постоянного коэффициента.
+
+    nodes_1d = np.array([0.0, 0.5, 1.0])
+
+    @staticmethod
+    def psi_1d(xi):
+        xi = np.asarray(xi, dtype=float)
+        return np.stack([
+            2.0 * (xi - 0.5) * (xi - 1.0),
+            -4.0 * xi * (xi - 1.0),
+            2.0 * xi * (xi - 0.5)
+        ])
+
+    @staticmethod
+    def d_psi_1d(xi):
+        xi = np.asarray(xi, dtype=float)
+        return np.stack([
+            4.0 * xi - 3.0,
+            -8.0 * xi + 4.0,
+            4.0 * xi - 1.0
+        ])
+
+    @classmethod
+    def _tabulate(cls):
+        # точки и веса Гаусса на [0,1]
+        t = (np.array(Gauss.points) + 1.0) * 0.5
+        w = np.array(Gauss.weights) * 0.5
+
+        # xi меняется по первой оси сетки квадратуры, eta - по второй
+        xi, eta = np.meshgrid(t, t, indexing="ij")
+        weights = np.outer(w, w)
+
+        x, dx = cls.psi_1d(xi), cls.d_psi_1d(xi)
+        y, dy = cls.psi_1d(eta), cls.d_psi_1d(eta)
+
+        # значения и производные 9 базисных функций в 25 точках квадратуры
+        psi = np.einsum("bpq,apq->bapq", y, x).reshape(9, 5, 5)
+        d_psi_xi = np.einsum("bpq,apq->bapq", y, dx).reshape(9, 5, 5)
+        d_psi_eta = np.einsum("bpq,apq->bapq", dy, x).reshape(9, 5, 5)
+
+        # одномерные таблицы масс для сторон элемента: int psi_i psi_j и int xi psi_i psi_j по [0,1]
+        psi_t = cls.psi_1d(t)
+        cls.edge_mass_0 = np.einsum("ip,jp,p->ij", psi_t, psi_t, w)
+        cls.edge_mass_1 = np.einsum("ip,jp,p->ij", psi_t, psi_t, w * t)
+
+        # значения базисных функций в точках квадратуры (9, 25): u в точках = u_e @ psi_points
+        cls.psi_points = psi.reshape(9, 25)
+
+        def point_table(u, v, weight):
+            return np.einsum("ipq,jpq,pq->pqij", u, v, weights * weight).reshape(25, 9, 9)
+
+        cls.point_stiffness_r0 = point_table(d_psi_xi, d_psi_xi, 1.0)
+        cls.point_stiffness_r1 = point_table(d_psi_xi, d_psi_xi, xi)
+        cls.point_stiffness_z0 = point_table(d_psi_eta, d_psi_eta, 1.0)
+        cls.point_stiffness_z1 = point_table(d_psi_eta, d_psi_eta, xi)
+        cls.point_mass_0 = point_table(psi, psi, 1.0)
+        cls.point_mass_1 = point_table(psi, psi, xi)
+
+        cls.stiffness_r0 = cls.point_stiffness_r0.sum(axis=0)
+        cls.stiffness_r1 = cls.point_stiffness_r1.sum(axis=0)
+        cls.stiffness_z0 = cls.point_stiffness_z0.sum(axis=0)
+        cls.stiffness_z1 = cls.point_stiffness_z1.sum(axis=0)
+        cls.mass_0 = cls.point_mass_0.sum(axis=0)
+        cls.mass_1 = cls.point_mass_1.sum(axis=0)
+
+    @staticmethod
+    def _geometry(rk, rk1, zk, zk1):
+        # для массивов элементов коэффициенты получают форму (n, 1, 1) и результат - (n, 9, 9)
+        rk = np.asarray(rk, dtype=float)[..., None, None]
+        hr = np.asarray(rk1, dtype=float)[..., None, None] - rk
+        hz = np.asarray(zk1, dtype=float)[..., None, None] - np.asarray(zk, dtype=float)[..., None, None]
+        return rk, hr, hz
+
+    @classmethod
+    def stiffness(cls, rk, rk1, zk, zk1):
+        rk, hr, hz = cls._geometry(rk, rk1, zk, zk1)
+
+        return (hz / hr * (rk * cls.stiffness_r0 + hr * cls.stiffness_r1)
+                + hr / hz * (rk * cls.stiffness_z0 + hr * cls.stiffness_z1))
+
+    @classmethod
+    def mass(cls, rk, rk1, zk, zk1):
+        rk, hr, hz = cls._geometry(rk, rk1, zk, zk1)
+
+        return hr * hz * (rk * cls.mass_0 + hr * cls.mass_1)
+
+    @classmethod
+    def edge_mass(cls, local_borders, rk, rk1, zk, zk1):
+        # int r psi_i psi_j по стороне элемента (0 - низ, 1 - лево, 2 - право, 3 - верх) для массивов сторон:
+        # на вертикальной стороне r постоянен, на горизонтальной r = rk + hr * xi
+        local_borders = np.asarray(local_borders)
+        rk = np.asarray(rk, dtype=float)[:, None, None]
+        rk1 = np.asarray(rk1, dtype=float)[:, None, None]
+        hr = rk1 - rk
+        hz = np.asarray(zk1, dtype=float)[:, None, None] - np.asarray(zk, dtype=float)[:, None, None]
+        sides = local_borders[:, None, None]
+
+        vertical = hz * np.where(sides == 1, rk, rk1) * cls.edge_mass_0
+        horizontal = hr * (rk * cls.edge_mass_0 + hr * cls.edge_mass_1)
+        return np.where((sides == 1) | (sides == 2), vertical, horizontal)
+
+    @staticmethod
+    def _weighted(coefficients, table):
+        # sum_q c[e, q] * table[q] для всех элементов: (n, 25) x (25, 9, 9) -> (n, 9, 9)
+        coefficients = np.asarray(coefficients, dtype=float)
+        return (coefficients @ table.reshape(25, 81)).reshape(len(coefficients), 9, 9)
+
+    @classmethod
+    def stiffness_at_points(cls, coefficients, rk, rk1, zk, zk1):
+        # G с коэффициентом, заданным в точках квадратуры каждого элемента (n, 25)
+        rk, hr, hz = cls._geometry(rk, rk1, zk, zk1)
+
+        return (hz / hr * (rk * cls._weighted(coefficients, cls.point_stiffness_r0)
+                           + hr * cls._weighted(coefficients, cls.point_stiffness_r1))
+                + hr / hz * (rk * cls._weighted(coefficients, cls.point_stiffness_z0)
+                             + hr * cls._weighted(coefficients, cls.point_stiffness_z1)))
+
+    @classmethod
+    def mass_at_points(cls, coefficients, rk, rk1, zk, zk1):
+        rk, hr, hz = cls._geometry(rk, rk1, zk, zk1)
+
+        return hr * hz * (rk * cls._weighted(coefficients, cls.point_mass_0)
+                          + hr * cls._weighted(coefficients, cls.point_mass_1))
+
+    @classmethod
+    def stiffness_point_products(cls, element_values, rk, rk1, zk, zk1):
+        # вклад каждой точки квадратуры в G_e u_e: (n, 9) -> (n, 25, 9)
+        rk, hr, hz = cls._geometry(rk, rk1, zk, zk1)
+
+        def product(table):
+            return np.tensordot(element_values, table, axes=([1], [2]))
+
+        return (hz / hr * (rk * product(cls.point_stiffness_r0) + hr * product(cls.point_stiffness_r1))
+                + hr / hz * (rk * product(cls.point_stiffness_z0) + hr * product(cls.point_stiffness_z1)))
+
+    @classmethod
+    def mass_point_products(cls, element_values, rk, rk1, zk, zk1):
+        # вклад каждой точки квадратуры в M_e u_e: (n, 9) -> (n, 25, 9)
+        rk, hr, hz = cls._geometry(rk, rk1, zk, zk1)
+
+        def product(table):
+            return np.tensordot(element_values, table, axes=([1], [2]))
+
+        return hr * hz * (rk * product(cls.point_mass_0) + hr * product(cls.point_mass_1))
+
+
+ReferenceElement._tabulate()
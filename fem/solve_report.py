@@ -0,0 +1,96 @@
+import contextlib
+import json
+import time
+import tracemalloc
+import numpy as np
+from dataclasses import dataclass, field, asdict
+
+@dataclass
+class PhaseRecord:
+    name: str
+    wall_time: float
+    # пик памяти Python-аллокаций за время этапа в байтах (None, если память не отслеживается)
+    peak_memory: int | None = None
+
+
+@dataclass
+class SolveReport:
+    # Отчет о расчете: время и пик памяти по этапам (сетка, нумерация, портрет, сборка, краевые, решение, вывод)
+    # и сходимость решателя. Память считается через tracemalloc, который заметно замедляет
+    # код с большим числом мелких объектов, поэтому по умолчанию выключен
+    track_memory: bool = False
+    phases: list[PhaseRecord] = field(default_factory=list)
+    solver: str = ""
+    size: int = 0
+    iterations_count: int = 0
+    # невязки по итерациям (для Los - относительные ||b - Ax|| / ||b||)
+    residual_history: list[float] = field(default_factory=list)
+    relative_residual: float | None = None
+    # относительные невязки нелинейной задачи ||b(u) - A(u) u|| / ||b(u)|| по внешним итерациям (NonlinearSolver)
+    nonlinear_history: list[float] = field(default_factory=list)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        tracing = self.track_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.track_memory:
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            peak_memory = tracemalloc.get_traced_memory()[1] if self.track_memory else None
+            if tracing:
+                tracemalloc.stop()
+            self.add_phase(name, wall_time, peak_memory)
+
+    def add_phase(self, name: str, wall_time: float, peak_memory: int | None = None):
+        # повторный вход в этап (например, вывод до и после решения) суммирует время и берет максимум памяти
+        for p in self.phases:
+            if p.name == name:
+                p.wall_time += wall_time
+                if peak_memory is not None:
+                    p.peak_memory = max(p.peak_memory or 0, peak_memory)
+                return
+
+        self.phases.append(PhaseRecord(name, wall_time, peak_memory))
+
+    def record_solver(self, solver, matrix, right_part, solution):
+        self.solver = type(solver).__name__
+        self.size = matrix.size
+        self.iterations_count = solver.iterations_count
+        self.residual_history = [float(r) for r in getattr(solver, "residual_history", [])]
+
+        right_part = np.asarray(right_part, dtype=float)
+        right_part_norm = float(np.linalg.norm(right_part))
+        residual_norm = float(np.linalg.norm(right_part - np.asarray(matrix.dot(solution))))
+        self.relative_residual = residual_norm / right_part_norm if right_part_norm > 0.0 else residual_norm
+
+    def total_time(self):
+        return sum(p.wall_time for p in self.phases)
+
+    def to_dict(self):
+        result = asdict(self)
+        result["total_time"] = self.total_time()
+        return result
+
+    def dump_json(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=4)
+
+    def print_summary(self):
+        print("Этап Время,с Пик памяти,МБ")
+
+        for p in self.phases:
+            memory = f"{p.peak_memory / 2 ** 20:.1f}" if p.peak_memory is not None else "-"
+            print(f"{p.name} {p.wall_time:.3f} {memory}")
+
+        print(f"Решатель {self.solver}: {self.iterations_count} итераций, "
+              f"относительная невязка {self.relative_residual:.2e}")
+
+        if self.nonlinear_history:
+            print(f"Нелинейные итерации: {len(self.nonlinear_history) - 1}, "
+                  f"невязка {self.nonlinear_history[-1]:.2e}")
@@ -1,10 +1,25 @@
+import threading
+import numpy as np
+
 class SparseMatrix:
-    def __init__(self, ig: list[int], jg: list[int]):
-        self.ig = ig
-        self.jg = jg
-        self.di = [0.0] * (len(ig) - 1)
-        self.gg = [0.0] * len(jg)
+    def __init__(self, ig, jg):
+        # хранение в непрерывных массивах NumPy (int32 индексы, float64 значения)
+        self.ig = np.ascontiguousarray(ig, dtype=np.int32)
+        self.jg = np.ascontiguousarray(jg, dtype=np.int32)
+        self.di = np.zeros(len(ig) - 1)
+        self.gg = np.zeros(len(jg))
+
+        # номер строки для каждого элемента gg и схема умножения на вектор
+        self.rows = np.repeat(np.arange(len(ig) - 1, dtype=np.int32), np.diff(self.ig))
+        self.build_product_layout()
+
         self.size = len(self.di)
+        self.element_basis = None
+        self.scatter_map = None
+
+    def set_scatter_map(self, element_basis, scatter_map):
+        self.element_basis = element_basis
+        self.scatter_map = scatter_map
 
     def add(self, i: int, j: int, value: float):
         if i == j:
@@ -13,28 +28,128 @@ class SparseMatrix:
             for idx in range(self.ig[i], self.ig[i + 1]):
                 if self.jg[idx] != j: continue
                 self.gg[idx] += value
+                break
+
+    def add_local(self, element: int, local_matrix):
+        # сложение локальной матрицы по заранее посчитанной карте позиций (PortraitBuilder.generate_scatter_map)
+        basis = self.element_basis[element]
+        offsets = self.scatter_map[element]
+
+        lower = basis[:, None] > basis[None, :]
+        diagonal = offsets == -1
+        self.gg[offsets[lower]] += local_matrix[lower]
+        self.di[np.broadcast_to(basis[:, None], offsets.shape)[diagonal]] += local_matrix[diagonal]
 
-    def dot(self, vector: list[float], product: list[float] = None):
+    def dot(self, vector, product=None):
         if self.size != len(vector):
             raise Exception("Size of matrix not equal to size of vector")
 
+        return self.dot_arrays(np.asarray(vector, dtype=float), product)
+
+    def build_product_layout(self):
+        # Умножение - две суммы по отрезкам (np.add.reduceat): по строкам нижнего треугольника с диагональю
+        # в конце каждой строки и по столбцам нижнего треугольника (= строкам верхнего) с нулевым
+        # слагаемым в конце каждого столбца. Дополнительные слагаемые делают все отрезки непустыми.
+        # Индексы - intp, чтобы take и присваивание по индексам не создавали временных копий
+        # (take с mode="clip": при mode="raise" NumPy пишет результат через временный буфер)
+        n = len(self.ig) - 1
+        nnz = len(self.jg)
+        ig = self.ig.astype(np.intp)
+        rows = self.rows.astype(np.intp)
+        jg = self.jg.astype(np.intp)
+        nodes = np.arange(n, dtype=np.intp)
+
+        # строки: элемент k нижнего треугольника -> k + rows[k], диагональ строки i -> ig[i + 1] + i
+        self.lower_slots = np.arange(nnz, dtype=np.intp) + rows
+        self.diagonal_slots = ig[1:] + nodes
+        self.row_starts = ig[:-1] + nodes
+        self.row_columns = np.empty(nnz + n, dtype=np.intp)
+        self.row_columns[self.lower_slots] = jg
+        self.row_columns[self.diagonal_slots] = nodes
+
+        # столбцы: элементы упорядочены по jg, нулевое слагаемое - в конце столбца
+        counts = np.bincount(jg, minlength=n)
+        column_ends = np.cumsum(counts)
+        order = np.argsort(jg, kind="stable")
+        self.upper_slots = np.empty(nnz, dtype=np.intp)
+        self.upper_slots[order] = np.arange(nnz, dtype=np.intp) + jg[order]
+        self.padding_slots = column_ends + nodes
+        self.column_starts = column_ends - counts + nodes
+        self.column_rows = np.zeros(nnz + n, dtype=np.intp)
+        self.column_rows[self.upper_slots] = rows
+
+        # рабочие буферы создаются в каждом потоке свои: dot можно вызывать из нескольких потоков
+        self.buffers = threading.local()
+
+    def product_buffers(self):
+        buffers = getattr(self.buffers, "arrays", None)
+        if buffers is None:
+            size = len(self.jg) + self.size
+            buffers = (np.empty(size), np.empty(size), np.empty(self.size))
+            self.buffers.arrays = buffers
+        return buffers
+
+    def dot_arrays(self, vector: np.ndarray, product: np.ndarray = None):
+        # product = (D + L + L^T) * vector, результат пишется в переданный буфер без выделения памяти
         if product is None:
-            product = [0.0] * len(vector)
-        else:
-            for i in range(len(product)):
-                product[i] = 0.0
+            product = np.empty(self.size)
 
-        for i in range(self.size):
-            product[i] += self.di[i] * vector[i]
+        values, factors, upper = self.product_buffers()
+
+        # нижний треугольник и диагональ: product[i] = di[i] * vector[i] + sum gg[k] * vector[jg[k]]
+        values[self.lower_slots] = self.gg
+        values[self.diagonal_slots] = self.di
+        np.take(vector, self.row_columns, out=factors, mode="clip")
+        np.multiply(values, factors, out=values)
+        np.add.reduceat(values, self.row_starts, out=product)
 
-            for j in range(self.ig[i], self.ig[i + 1]):
-                j_index = self.jg[j]
-                product[i] += self.gg[j] * vector[j_index]
-                product[j_index] += self.gg[j] * vector[i]
+        # верхний треугольник: product[jg[k]] += gg[k] * vector[rows[k]]
+        values[self.upper_slots] = self.gg
+        values[self.padding_slots] = 0.0
+        np.take(vector, self.column_rows, out=factors, mode="clip")
+        np.multiply(values, factors, out=values)
+        np.add.reduceat(values, self.column_starts, out=upper)
+        product += upper
 
         return product
 
-    def print_dense(self, path: str):
+    def save(self, path: str):
+        # ig/jg/di/gg в бинарном контейнере .npz без потери точности
+        np.savez(path, ig=np.asarray(self.ig, dtype=np.int32), jg=np.asarray(self.jg, dtype=np.int32),
+                 di=np.asarray(self.di, dtype=float), gg=np.asarray(self.gg, dtype=float))
+
+    @staticmethod
+    def load(path: str):
+        with np.load(path) as data:
+            matrix = SparseMatrix(data["ig"], data["jg"])
+            matrix.di[:] = data["di"]
+            matrix.gg[:] = data["gg"]
+
+        return matrix
+
+    def write_matrix_market(self, path: str):
+        # формат Matrix Market (coordinate real symmetric): хранится нижний треугольник с диагональю,
+        # индексы с единицы, строки упорядочены по (строка, столбец)
+        ig = np.asarray(self.ig, dtype=np.int64)
+        jg = np.asarray(self.jg, dtype=np.int64)
+        diagonal = np.arange(self.size)
+
+        rows = np.concatenate((np.repeat(diagonal, np.diff(ig)), diagonal))
+        cols = np.concatenate((jg, diagonal))
+        values = np.concatenate((np.asarray(self.gg, dtype=float), np.asarray(self.di, dtype=float)))
+        order = np.lexsort((cols, rows))
+
+        with open(path, "w") as file:
+            file.write("%%MatrixMarket matrix coordinate real symmetric\n")
+            file.write(f"{self.size} {self.size} {len(values)}\n")
+            np.savetxt(file, np.column_stack((rows[order] + 1, cols[order] + 1, values[order])),
+                       fmt=("%d", "%d", "%.17g"))
+
+    def print_dense(self, path: str, max_size: int = 2000):
+        # только для отладки: плотная матрица занимает size^2 чисел в памяти и в файле
+        if self.size > max_size:
+            raise Exception(f"Matrix of size {self.size} is too large for a dense dump (max_size = {max_size})")
+
         a = [[0.0 for _ in range(self.size)] for _ in range(self.size)]
 
         for i in range(self.size):
@@ -52,7 +167,5 @@ class SparseMatrix:
                 file.write("\n")
 
     def clear(self):
-        for i in range(self.size):
-            self.di[i] = 0.0
-        for i in range(len(self.gg)):
-            self.gg[i] = 0.0
\ No newline at end of file
+        self.di.fill(0.0)
+        self.gg.fill(0.0)
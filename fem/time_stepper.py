@@ -0,0 +1,181 @@
+import copy
+import os
+import numpy as np
+
+from mesh.mesh import Mesh
+from mesh.formula import Formula
+from portrait.numerator import Numerator
+from fem.matrix_assembler import MatrixAssembler
+from fem.sparse_matrix import SparseMatrix
+from fem.ldlt import Ldlt
+from fem.los import Los
+from fem.preconditioner import Preconditioner
+from fem.solve_report import SolveReport
+from result_bundle import ResultBundle
+
+class TimeStepper:
+    # Нестационарная задача sigma * du/dt - div(lmbda * grad u) + gamma * u = f на той же сетке.
+    # После пространственной дискретизации M * du/dt + K * u = b, где M - матрица масс с коэффициентом sigma
+    # подобласти, K - матрица стационарной задачи (вместе с 3-ми краевыми), b - правая часть (f, 2-е и 3-и краевые).
+    # f и краевые условия от времени не зависят. Схемы (tau - шаг):
+    #   "euler" - (M / tau + K) u_n+1 = b + M / tau * u_n,
+    #   "crank_nicolson" - (M / tau + K / 2) u_n+1 = b + (M / tau - K / 2) u_n,
+    #   "bdf2" - (3M / (2tau) + K) u_n+1 = b + M (4 u_n - u_n-1) / (2tau), первый шаг - неявный Эйлер.
+    # M, K и b собираются один раз. Матрица шага (a * M + c * K с исключенными 1-ми краевыми) строится и
+    # раскладывается (Ldlt) или получает предобуславливатель (Los) один раз для каждого шага tau;
+    # на каждом шаге - только правая часть и обратный ход Ldlt или Los с начальным приближением u_n
+    schemes = ("euler", "crank_nicolson", "bdf2")
+
+    def __init__(self, mesh: Mesh, time_step: float, scheme: str = "euler", sigma: list[float] = None,
+                 solver: str = "ldlt", preconditioner: Preconditioner = None, report: SolveReport = None):
+        if scheme not in TimeStepper.schemes:
+            raise Exception(f"Unknown time scheme: {scheme}")
+        if solver not in ("ldlt", "los"):
+            raise Exception(f"Unknown step solver: {solver}")
+
+        self.mesh = mesh
+        self.scheme = scheme
+        self.solver = solver
+        self.preconditioner = preconditioner
+        self.report = report if report is not None else SolveReport()
+
+        with self.report.phase("numbering"):
+            Numerator.numerate_basis_functions(mesh)
+
+        with self.report.phase("portrait"):
+            self.assembler = MatrixAssembler(mesh, incremental=True)
+
+        with self.report.phase("assembly"):
+            self.assemble(sigma)
+
+        self.nodes, self.values = self.assembler.dirichlet_values()
+        # матрицы шага: (a, c) -> (матрица, перенос 1-х краевых, решатель)
+        self.operators: dict[tuple[float, float], tuple] = {}
+
+        self.time_step = time_step
+        self.time: float = 0.0
+        self.steps_count: int = 0
+        self.iterations_count: int = 0    # итерации Los за все шаги
+        self.solution = np.zeros(len(self.stationary_b))
+        self.previous = None    # u_n-1 для BDF2
+        self.last_step = None   # (решатель, матрица, правая часть) последнего шага для отчета
+
+    def assemble(self, sigma: list[float] = None):
+        # K и b - как в стационарной задаче без 1-х краевых, M - сумма sigma_area * M_area
+        assembler = self.assembler
+        assembler.assemble()
+        assembler.account_newton()
+        assembler.account_neumann()
+
+        self.stiffness = SparseMatrix(assembler.ig, assembler.jg)
+        self.stiffness.di[:] = assembler.global_matrix.di
+        self.stiffness.gg[:] = assembler.global_matrix.gg
+        self.stationary_b = assembler.global_b.copy()
+
+        areas_count = len(assembler.mass_di)
+        sigma = np.ones(areas_count) if sigma is None else np.asarray(sigma, dtype=float)
+        self.mass = SparseMatrix(assembler.ig, assembler.jg)
+        self.mass.di[:] = sigma @ assembler.mass_di
+        self.mass.gg[:] = sigma @ assembler.mass_gg
+
+    def set_initial(self, initial=None, time: float = 0.0):
+        # initial - массив значений в базисных узлах, функция f(r, z) или None (ноль); в узлах 1-х краевых - их значения
+        if initial is None:
+            solution = np.zeros(len(self.stationary_b))
+        elif callable(initial):
+            solution = Formula.evaluate_function(initial, self.assembler.basis_r, self.assembler.basis_z)
+        else:
+            solution = np.array(initial, dtype=float)
+
+        solution[self.nodes] = self.values
+        self.solution = solution
+        self.previous = None
+        self.time = time
+        self.steps_count = 0
+
+    def operator(self, mass_factor: float, stiffness_factor: float):
+        key = (mass_factor, stiffness_factor)
+        if key in self.operators:
+            return self.operators[key]
+
+        with self.report.phase("factorization"):
+            matrix = SparseMatrix(self.assembler.ig, self.assembler.jg)
+            matrix.di[:] = mass_factor * self.mass.di + stiffness_factor * self.stiffness.di
+            matrix.gg[:] = mass_factor * self.mass.gg + stiffness_factor * self.stiffness.gg
+            lifting = MatrixAssembler.eliminate_dirichlet(matrix, self.nodes)
+
+            if self.solver == "ldlt":
+                solver = Ldlt()
+                solver.factorize(matrix)
+            else:
+                # у каждой матрицы шага свой предобуславливатель: общий объект хранил бы разложение
+                # последней построенной матрицы (смена tau, первый шаг BDF2)
+                solver = Los(10000, 1e-12, copy.deepcopy(self.preconditioner))
+                solver.preconditioner.build(matrix)
+
+        self.operators[key] = (matrix, lifting, solver)
+        return self.operators[key]
+
+    def step(self):
+        tau = self.time_step
+        u = self.solution
+
+        if self.scheme == "crank_nicolson":
+            mass_factor, stiffness_factor = 1.0 / tau, 0.5
+            right_part = self.stationary_b + self.mass.dot(u) / tau - 0.5 * self.stiffness.dot(u)
+        elif self.scheme == "bdf2" and self.previous is not None:
+            mass_factor, stiffness_factor = 1.5 / tau, 1.0
+            right_part = self.stationary_b + self.mass.dot(4.0 * u - self.previous) / (2.0 * tau)
+        else:
+            mass_factor, stiffness_factor = 1.0 / tau, 1.0
+            right_part = self.stationary_b + self.mass.dot(u) / tau
+
+        matrix, lifting, solver = self.operator(mass_factor, stiffness_factor)
+
+        with self.report.phase("step"):
+            MatrixAssembler.lift_dirichlet(right_part, lifting, self.nodes, self.values)
+
+            if self.solver == "ldlt":
+                solution = solver.solve(right_part)
+            else:
+                solver.compute(matrix, right_part, initial=u, build_preconditioner=False)
+                solution = solver.solution.copy()
+
+        self.iterations_count += solver.iterations_count
+        self.last_step = (solver, matrix, right_part)
+        self.previous = u
+        self.solution = solution
+        self.time += tau
+        self.steps_count += 1
+        return solution
+
+    def run(self, steps: int, snapshot_every: int = 0, output_dir: str = None, callback=None) -> np.ndarray:
+        # snapshot_every > 0 - каждые snapshot_every шагов решение пишется в output_dir/snapshot_<шаг>.bin
+        # (ResultBundle: time, solution) и/или передается в callback(шаг, время, решение); снимки не копятся в памяти
+        if snapshot_every > 0 and output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+        for _ in range(steps):
+            self.step()
+
+            if snapshot_every > 0 and self.steps_count % snapshot_every == 0:
+                with self.report.phase("output"):
+                    if output_dir is not None:
+                        ResultBundle.write(os.path.join(output_dir, f"snapshot_{self.steps_count:06d}.bin"),
+                                           {"time": np.array([self.time]), "solution": self.solution})
+                    if callback is not None:
+                        callback(self.steps_count, self.time, self.solution)
+
+        # в отчет - невязка последнего шага и число итераций за все шаги
+        if self.last_step is not None:
+            solver, matrix, right_part = self.last_step
+            self.report.record_solver(solver, matrix, right_part, self.solution)
+            self.report.iterations_count = self.iterations_count
+
+        return self.solution
+
+    def set_time_step(self, time_step: float):
+        # матрицы шага для прежних tau остаются в operators и переиспользуются при возврате к ним;
+        # BDF2 после смены шага снова начинается с шага неявного Эйлера
+        self.time_step = time_step
+        self.previous = None
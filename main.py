@@ -1,19 +1,42 @@
+import argparse
 import random
 from mesh.mesh_parameters import MeshParameters
 from mesh.mesh_builder import MeshBuilder
 from mesh.point import Point
 from fem.fem_solver import FemSolver
+from fem.nonlinear_solver import NonlinearSolver
+from fem.solve_report import SolveReport
+from solve_cache import SolveCache
+
+parser = argparse.ArgumentParser(description="Решение задачи из input/area.json")
+parser.add_argument("--cache", nargs="?", const="cache", default=None,
+                    help="папка кэша сетки, портрета и собранной системы (по умолчанию кэш не используется)")
+args = parser.parse_args()
 
 parameters = MeshParameters.read_json("input/area.json")
 
-mesh_builder = MeshBuilder(parameters)
+report = SolveReport(track_memory=True)
+# с --cache сетка, портрет и собранная система берутся из кэша, если входные данные и код не менялись
+cache = SolveCache(args.cache) if args.cache is not None else None
+
+with report.phase("mesh"):
+    if cache is not None:
+        mesh = cache.build_mesh(parameters)
+    else:
+        mesh_builder = MeshBuilder(parameters)
+        mesh_builder.create_points()
+        mesh_builder.create_elements()
+        mesh_builder.create_boundaries()
+        mesh = mesh_builder.get_mesh()
 
-mesh_builder.create_points()
-mesh_builder.create_elements()
-mesh_builder.create_boundaries()
-mesh = mesh_builder.get_mesh()
-solver = FemSolver(mesh)
+if any(area.nonlinear for area in parameters.area_properties):
+    # lmbda или gamma зависят от решения - метод Ньютона с шагами Пикара вдали от решения
+    solver = NonlinearSolver(mesh, method="newton", report=report, cache=cache, parameters=parameters)
+else:
+    solver = FemSolver(mesh, report=report, cache=cache, parameters=parameters)
 solver.solve()
+report.print_summary()
+report.dump_json("output/report.json")
 
 # Дальше будем сравнивать аналитическое решение и численное
 # Будем сравнивать в наборе произвольных точек
@@ -1,5 +1,10 @@
 class AreaProperty:
-    def __init__(self, lmbda: float, gamma: float, f):
+    def __init__(self, lmbda, gamma, f):
+        # lmbda и gamma - числа или функции решения u (Formula с переменной u) для нелинейной задачи
         self.lmbda = lmbda
         self.gamma = gamma
-        self.f = f
\ No newline at end of file
+        self.f = f
+
+    @property
+    def nonlinear(self) -> bool:
+        return callable(self.lmbda) or callable(self.gamma)
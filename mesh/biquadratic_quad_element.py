@@ -9,31 +9,35 @@ class BiquadraticQuadElement:
         [6, 7, 8]   # верх
     ]
 
-    def __init__(self, nodes: list[int], area_number: int):
-        self.local_basis_to_physical_nodes: list[int] = [0, -1, 1, -1, -1, -1, 2, -1, 3]
-
-        self.mid_edge_corner_pairs: list[tuple[int, int]] = [
-            None,
-            (0, 1),
-            None,
-            (0, 2),
-            None,
-            (1, 3),
-            None,
-            (2, 3),
-            None
-        ]
+    # таблицы общие для всех элементов
+    local_basis_to_physical_nodes: list[int] = [0, -1, 1, -1, -1, -1, 2, -1, 3]
+
+    mid_edge_corner_pairs: list[tuple[int, int]] = [
+        None,
+        (0, 1),
+        None,
+        (0, 2),
+        None,
+        (1, 3),
+        None,
+        (2, 3),
+        None
+    ]
+
+    # пары угловых узлов на сторонах: низ, лево, право, верх
+    edge_corner_pairs: list[tuple[int, int]] = [(0, 1), (0, 2), (1, 3), (2, 3)]
 
+    __slots__ = ("area_number", "physical_nodes_indices", "basis_indices")
+
+    def __init__(self, nodes: list[int], area_number: int):
         self.area_number = area_number
         self.physical_nodes_indices = nodes
         self.basis_indices: list[int] = [0] * 9
 
-        self.edges: list[Edge] = [
-            Edge(nodes[0], nodes[1]),
-            Edge(nodes[0], nodes[2]),
-            Edge(nodes[1], nodes[3]),
-            Edge(nodes[2], nodes[3])
-        ]
+    @property
+    def edges(self) -> list[Edge]:
+        nodes = self.physical_nodes_indices
+        return [Edge(nodes[a], nodes[b]) for a, b in self.edge_corner_pairs]
 
     def set_basis_index(self, local_basis_index: int, global_index: int):
         self.basis_indices[local_basis_index] = global_index
@@ -0,0 +1,64 @@
+import numpy as np
+
+from mesh.boundary_condition import BoundaryCondition, BoundaryConditionS3
+from mesh.boundary_formula import BoundaryFormula, BoundaryFormulaS3
+
+class BoundaryConditionArray:
+    # Краевые условия одного типа в виде массивов: для каждой стороны элемента на границе - номер элемента,
+    # номер стороны (local_border) и номер формулы в formulas (formula_index из area.json).
+    # conditions[i] возвращает BoundaryCondition / BoundaryConditionS3, созданный по запросу
+    def __init__(self, formulas: list[BoundaryFormula], elements=None, local_borders=None, formula_indices=None):
+        self.formulas = formulas
+        self.elements = np.zeros(0, dtype=np.int32) if elements is None else np.asarray(elements, dtype=np.int32)
+        self.local_borders = (np.zeros(0, dtype=np.int32) if local_borders is None
+                              else np.asarray(local_borders, dtype=np.int32))
+        self.formula_indices = (np.zeros(0, dtype=np.int32) if formula_indices is None
+                                else np.asarray(formula_indices, dtype=np.int32))
+
+    @staticmethod
+    def from_conditions(conditions: list[BoundaryCondition]):
+        # условия с одной и той же функцией (и beta) получают общую формулу
+        formulas: list[BoundaryFormula] = []
+        numbers: dict[tuple, int] = {}
+        formula_indices = []
+
+        for c in conditions:
+            beta = c.beta if isinstance(c, BoundaryConditionS3) else None
+            key = (id(c.value), beta)
+
+            if key not in numbers:
+                numbers[key] = len(formulas)
+                formulas.append(BoundaryFormula(c.value) if beta is None else BoundaryFormulaS3(c.value, beta))
+            formula_indices.append(numbers[key])
+
+        return BoundaryConditionArray(formulas, [c.element for c in conditions],
+                                      [c.local_border for c in conditions], formula_indices)
+
+    def append(self, elements: np.ndarray, local_border: int, formula_index: int):
+        # стороны local_border элементов elements с формулой formula_index
+        self.elements = np.concatenate((self.elements, np.asarray(elements, dtype=np.int32)))
+        self.local_borders = np.concatenate((self.local_borders, np.full(len(elements), local_border, dtype=np.int32)))
+        self.formula_indices = np.concatenate((self.formula_indices,
+                                               np.full(len(elements), formula_index, dtype=np.int32)))
+
+    @property
+    def betas(self) -> np.ndarray:
+        # beta третьего краевого для каждого условия (0 для формул без beta)
+        formula_betas = np.array([getattr(f, "beta", 0.0) for f in self.formulas] or [0.0])
+        return formula_betas[self.formula_indices]
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __getitem__(self, index: int):
+        element = int(self.elements[index])
+        local_border = int(self.local_borders[index])
+        formula = self.formulas[self.formula_indices[index]]
+
+        if isinstance(formula, BoundaryFormulaS3):
+            return BoundaryConditionS3(element, local_border, formula.value, formula.beta)
+        return BoundaryCondition(element, local_border, formula.value)
+
+    def __iter__(self):
+        for index in range(len(self.elements)):
+            yield self[index]
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from typing import Callable
 
+from mesh.formula import Formula
+
 @dataclass
 class BoundaryFormula:
     value: Callable[[float, float], float]
@@ -8,6 +10,9 @@ class BoundaryFormula:
     def __call__(self, r: float, z: float):
         return self.value(r, z)
 
+    def evaluate(self, rs, zs):
+        return Formula.evaluate_function(self.value, rs, zs)
+
 @dataclass
 class BoundaryFormulaS3(BoundaryFormula):
     beta: float
@@ -0,0 +1,58 @@
+import numpy as np
+
+from mesh.biquadratic_quad_element import BiquadraticQuadElement
+
+class ElementArray:
+    # Элементы сетки в виде массивов связности: угловые узлы (n_elem, 4) (левый нижний, правый нижний,
+    # левый верхний, правый верхний), номера базисных функций (n_elem, 9) и номера подобластей (n_elem).
+    # elements[i] возвращает ElementView - легкий объект с интерфейсом BiquadraticQuadElement,
+    # который читает и пишет строки этих массивов
+    def __init__(self, corners: np.ndarray, area_numbers: np.ndarray, basis: np.ndarray = None):
+        self.corners = np.ascontiguousarray(corners, dtype=np.int32).reshape(-1, 4)
+        self.area_numbers = np.ascontiguousarray(area_numbers, dtype=np.int32)
+        # до нумерации (Numerator.numerate_basis_functions) номера базисных функций нулевые
+        self.basis = (np.zeros((len(self.corners), 9), dtype=np.int32) if basis is None
+                      else np.ascontiguousarray(basis, dtype=np.int32))
+
+    @staticmethod
+    def from_elements(elements: list[BiquadraticQuadElement]):
+        return ElementArray(np.array([e.physical_nodes_indices for e in elements]).reshape(-1, 4),
+                            np.array([e.area_number for e in elements]),
+                            np.array([e.basis_indices for e in elements]).reshape(-1, 9))
+
+    def __len__(self):
+        return len(self.corners)
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self.corners)
+        if not 0 <= index < len(self.corners):
+            raise IndexError("element index out of range")
+        return ElementView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.corners)):
+            yield ElementView(self, index)
+
+
+class ElementView(BiquadraticQuadElement):
+    __slots__ = ("elements", "index")
+
+    def __init__(self, elements: ElementArray, index: int):
+        self.elements = elements
+        self.index = index
+
+    @property
+    def physical_nodes_indices(self):
+        return self.elements.corners[self.index]
+
+    @property
+    def basis_indices(self):
+        return self.elements.basis[self.index]
+
+    @property
+    def area_number(self):
+        return int(self.elements.area_numbers[self.index])
+
+    def __repr__(self):
+        return f"ElementView(index={self.index}, nodes={self.physical_nodes_indices.tolist()}, area={self.area_number})"
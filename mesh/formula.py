@@ -0,0 +1,88 @@
+import math
+import types
+import numpy as np
+
+class Formula:
+    # Функция f(x, y) из area.json. Выражение компилируется дважды: со скалярными функциями math
+    # (вызов formula(x, y), как у прежних lambda) и с их аналогами из NumPy (evaluate(xs, ys) для массивов).
+    # Если выражение не векторизуется (например, использует min/max или условные выражения),
+    # evaluate считает его поточечно. Переменные по умолчанию x, y; для коэффициентов, зависящих
+    # от решения, - u (Formula(expression, ("u",)))
+    scalar_names = {
+        'math': math,
+        'exp': math.exp,
+        'sin': math.sin,
+        'cos': math.cos,
+        'tan': math.tan,
+        'log': math.log,
+        'log10': math.log10,
+        'sqrt': math.sqrt,
+        'pi': math.pi,
+        'e': math.e
+    }
+
+    array_names = {
+        'exp': np.exp,
+        'sin': np.sin,
+        'cos': np.cos,
+        'tan': np.tan,
+        'log': np.log,
+        'log10': np.log10,
+        'sqrt': np.sqrt,
+        'pi': np.pi,
+        'e': np.e
+    }
+    array_names['math'] = types.SimpleNamespace(**array_names, asin=np.arcsin, acos=np.arccos, atan=np.arctan,
+                                                sinh=np.sinh, cosh=np.cosh, tanh=np.tanh, fabs=np.abs,
+                                                pow=np.power, hypot=np.hypot, atan2=np.arctan2)
+
+    def __init__(self, expression: str, variables: tuple[str, ...] = ("x", "y")):
+        self.expression = expression
+        self.variables = tuple(variables)
+        self.compile()
+
+    def compile(self):
+        arguments = ", ".join(self.variables)
+        self.scalar = eval(f"lambda {arguments}: {self.expression}", dict(Formula.scalar_names))
+        self.vectorized = eval(f"lambda {arguments}: {self.expression}", dict(Formula.array_names))
+
+    def __call__(self, *args: float):
+        return self.scalar(*args)
+
+    def evaluate(self, *arrays) -> np.ndarray:
+        # по одному массиву на переменную: evaluate(xs, ys) или evaluate(us)
+        arrays = [np.asarray(a, dtype=float) for a in arrays]
+        shape = np.broadcast(*arrays).shape
+
+        try:
+            values = np.asarray(self.vectorized(*arrays), dtype=float)
+            # постоянное выражение дает скаляр - размножаем его на все точки
+            return np.array(np.broadcast_to(values, shape))
+        except (TypeError, ValueError, AttributeError):
+            return Formula.evaluate_pointwise(self.scalar, *arrays)
+
+    @staticmethod
+    def evaluate_pointwise(function, *arrays) -> np.ndarray:
+        arrays = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in arrays))
+        values = [function(*point) for point in zip(*(a.ravel().tolist() for a in arrays))]
+        return np.array(values, dtype=float).reshape(arrays[0].shape)
+
+    @staticmethod
+    def evaluate_function(function, xs, ys) -> np.ndarray:
+        # значения любой функции f(x, y) в массиве точек: у Formula и BoundaryFormula есть evaluate,
+        # обычные функции Python вызываются поточечно
+        if hasattr(function, "evaluate"):
+            return function.evaluate(xs, ys)
+        return Formula.evaluate_pointwise(function, xs, ys)
+
+    def __getstate__(self):
+        # скомпилированные lambda не сериализуются, поэтому сохраняется только текст выражения
+        return {"expression": self.expression, "variables": self.variables}
+
+    def __setstate__(self, state):
+        self.expression = state["expression"]
+        self.variables = tuple(state.get("variables", ("x", "y")))
+        self.compile()
+
+    def __repr__(self):
+        return self.expression
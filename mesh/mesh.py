@@ -1,20 +1,32 @@
 from mesh.point import Point
+from mesh.point_array import PointArray
 from mesh.biquadratic_quad_element import BiquadraticQuadElement
+from mesh.element_array import ElementArray
 from mesh.area_property import AreaProperty
 from mesh.boundary_condition import BoundaryCondition, BoundaryConditionS3
+from mesh.boundary_condition_array import BoundaryConditionArray
 
 class Mesh:
     def __init__(self,
-                 points: list[Point],
-                 elements: list[BiquadraticQuadElement],
+                 points: PointArray | list[Point],
+                 elements: ElementArray | list[BiquadraticQuadElement],
                  materials: list[AreaProperty],
-                 dirichlet: list[BoundaryCondition],
-                 neumann: list[BoundaryCondition],
-                 newton: list[BoundaryConditionS3]):
+                 dirichlet: BoundaryConditionArray | list[BoundaryCondition],
+                 neumann: BoundaryConditionArray | list[BoundaryCondition],
+                 newton: BoundaryConditionArray | list[BoundaryConditionS3]):
 
-        self.points = points
-        self.elements = elements
+        # узлы хранятся массивами координат; список Point (старый интерфейс) преобразуется
+        self.points = points if isinstance(points, PointArray) else PointArray.from_points(points)
+        # связность элементов хранится массивами (ElementArray), список элементов преобразуется
+        self.elements = elements if isinstance(elements, ElementArray) else ElementArray.from_elements(elements)
         self.materials = materials
-        self.dirichlet = dirichlet
-        self.neumann = neumann
-        self.newton = newton
\ No newline at end of file
+        # краевые условия хранятся массивами (элемент, сторона, номер формулы)
+        self.dirichlet = Mesh.condition_array(dirichlet)
+        self.neumann = Mesh.condition_array(neumann)
+        self.newton = Mesh.condition_array(newton)
+
+    @staticmethod
+    def condition_array(conditions) -> BoundaryConditionArray:
+        if isinstance(conditions, BoundaryConditionArray):
+            return conditions
+        return BoundaryConditionArray.from_conditions(conditions)
\ No newline at end of file
@@ -1,28 +1,29 @@
+import copy
+import numpy as np
+
 from mesh.mesh_parameters import MeshParameters, Border
-from mesh.point import Point
-from mesh.biquadratic_quad_element import BiquadraticQuadElement
-from mesh.boundary_condition import BoundaryCondition, BoundaryConditionS3
+from mesh.point_array import PointArray
+from mesh.element_array import ElementArray
+from mesh.boundary_condition_array import BoundaryConditionArray
 from mesh.boundary_type import BoundaryType
 from mesh.edge import Edge
 from mesh.mesh import Mesh
-from mesh.boundary_formula import BoundaryFormulaS3
 
 class MeshBuilder:
     def __init__(self, mesh_parameters: MeshParameters):
-        self.mesh_parameters = mesh_parameters
+        # prepare_refinement меняет параметры, поэтому работаем с копией: исходные параметры можно
+        # использовать повторно, например для построения сеток всех уровней
+        self.mesh_parameters = copy.deepcopy(mesh_parameters)
 
         self.prepare_refinement()
 
-        total_nr = self.mesh_parameters.abscissa_splits
-        total_nz = self.mesh_parameters.ordinate_splits
-
-        self.points = [Point(0.0, 0.0) for _ in range((total_nr + 1) * (total_nz + 1))]
-        self.elements = [None] * (total_nr * total_nz)
+        self.points = PointArray.zeros(0)   # заполняется в create_points
+        self.elements = ElementArray(np.zeros((0, 4)), np.zeros(0))   # заполняется в create_elements
         self.ir = [0] * self.mesh_parameters.abscissa_points_count
         self.iz = [0] * self.mesh_parameters.ordinate_points_count
-        self.dirichlet: list[BoundaryType] = []
-        self.neumann: list[BoundaryType] = []
-        self.newton: list[BoundaryType] = []
+        self.dirichlet = BoundaryConditionArray(self.mesh_parameters.boundary_formulas)
+        self.neumann = BoundaryConditionArray(self.mesh_parameters.boundary_formulas)
+        self.newton = BoundaryConditionArray(self.mesh_parameters.boundary_formulas)
 
     def prepare_refinement(self):
         if self.mesh_parameters.refinement == 0:
@@ -40,91 +41,60 @@ class MeshBuilder:
                 abs(self.mesh_parameters.ordinate_k) ** (1.0 / (2 ** self.mesh_parameters.refinement))
         )
 
-    def create_points(self):
-        total_nr = self.mesh_parameters.abscissa_splits + 1  # Nodes count on abscissa with splits
-        total_nz = self.mesh_parameters.ordinate_splits + 1  # Nodes count on ordinate with splits
-
-        primary_nr = self.mesh_parameters.abscissa_points_count  # Primary abscissa points count
-        primary_nz = self.mesh_parameters.ordinate_points_count  # Primary ordinate points count
-
-        # Forming nodes on main horizontal lines
-        ordinate_splits = 0
-
-        for i in range(primary_nz):
-            a = self.mesh_parameters.control_points[i * primary_nr]  # Start
-            b = self.mesh_parameters.control_points[i * primary_nr + 1]  # End
-
-            if self.mesh_parameters.abscissa_k < 0:
-                k = -1.0 / self.mesh_parameters.abscissa_k
-            else:
-                k = self.mesh_parameters.abscissa_k
-
-            if abs(k - 1.0) < 1e-14:
-                h = (b.r - a.r) / self.mesh_parameters.abscissa_splits
-            else:
-                h = (b.r - a.r) * (1.0 - k) / (1.0 - k ** self.mesh_parameters.abscissa_splits)
-
-            self.points[total_nr * ordinate_splits] = a
-
-            for l in range(1, self.mesh_parameters.abscissa_splits + 1):
-                x = self.points[total_nr * ordinate_splits + l - 1].r + h * (k ** (l - 1))
-                t = (x - a.r) / (b.r - a.r)
-                y = a.z + t * (b.z - a.z)
-
-                self.points[total_nr * ordinate_splits + l] = Point(x, y)
-
-            ordinate_splits += self.mesh_parameters.ordinate_splits
-
-        # Forming nodes on main vertical lines
-        abscissa_splits = 0
-
-        for i in range(primary_nr):
-            a = self.mesh_parameters.control_points[i]
-            b = self.mesh_parameters.control_points[primary_nr + i]
-
-            if self.mesh_parameters.ordinate_k < 0:
-                k = -1.0 / self.mesh_parameters.ordinate_k
-            else:
-                k = self.mesh_parameters.ordinate_k
-
-            if abs(k - 1.0) < 1e-14:
-                h = (b.z - a.z) / self.mesh_parameters.ordinate_splits
-            else:
-                h = (b.z - a.z) * (1.0 - k) / (1.0 - k ** self.mesh_parameters.ordinate_splits)
-
-            self.points[abscissa_splits] = a
-
-            for l in range(1, self.mesh_parameters.ordinate_splits + 1):
-                y = self.points[abscissa_splits + (l - 1) * total_nr].z + h * (k ** (l - 1))
-                t = (y - a.z) / (b.z - a.z)
-                x = a.r + t * (b.r - a.r)
-
-                self.points[abscissa_splits + l * total_nr] = Point(x, y)
-
-            abscissa_splits += self.mesh_parameters.abscissa_splits
+    @staticmethod
+    def progression_offsets(lengths: np.ndarray, splits: int, k: float) -> np.ndarray:
+        # смещения узлов от начала отрезков длины lengths при разбиении на splits частей
+        # с шагами h, h * k, h * k^2, ... (k < 0 означает сгущение в обратную сторону: 1 / |k|)
+        if k < 0:
+            k = -1.0 / k
 
-        # Form inner nodes
-        for i in range(1, total_nz):
-
-            if self.mesh_parameters.abscissa_k < 0:
-                k = -1.0 / self.mesh_parameters.abscissa_k
-            else:
-                k = self.mesh_parameters.abscissa_k
-
-            a = self.points[i * total_nr]
-            b = self.points[i * total_nr + self.mesh_parameters.abscissa_splits]
-
-            if abs(k - 1.0) < 1e-14:
-                h = (b.r - a.r) / self.mesh_parameters.abscissa_splits
-            else:
-                h = (b.r - a.r) * (1.0 - k) / (1.0 - k ** self.mesh_parameters.abscissa_splits)
+        if abs(k - 1.0) < 1e-14:
+            h = lengths / splits
+            powers = np.ones(splits)
+        else:
+            h = lengths * (1.0 - k) / (1.0 - k ** splits)
+            powers = np.concatenate(([1.0], np.cumprod(np.full(splits - 1, k))))
 
-            for l in range(1, self.mesh_parameters.abscissa_splits):
-                x = self.points[i * total_nr + l - 1].r + h * (k ** (l - 1))
-                t = (x - a.r) / (b.r - a.r)
-                y = a.z + t * (b.z - a.z)
+        offsets = np.empty((len(lengths), splits + 1))
+        offsets[:, 0] = 0.0
+        np.multiply(h[:, None], powers, out=offsets[:, 1:])
+        np.cumsum(offsets[:, 1:], axis=1, out=offsets[:, 1:])
+        return offsets
 
-                self.points[i * total_nr + l] = Point(x, y)
+    def create_points(self):
+        primary_nr = self.mesh_parameters.abscissa_points_count  # Primary abscissa points count
+        control_points = self.mesh_parameters.control_points
+
+        # Левая и правая границы области: от нижних опорных точек к верхним
+        start = [control_points[0], control_points[1]]
+        end = [control_points[primary_nr], control_points[primary_nr + 1]]
+        start_r = np.array([p.r for p in start])
+        start_z = np.array([p.z for p in start])
+        end_r = np.array([p.r for p in end])
+        end_z = np.array([p.z for p in end])
+
+        side_z = start_z[:, None] + MeshBuilder.progression_offsets(end_z - start_z, self.mesh_parameters.ordinate_splits,
+                                                                    self.mesh_parameters.ordinate_k)
+        t = (side_z - start_z[:, None]) / (end_z - start_z)[:, None]
+        side_r = start_r[:, None] + t * (end_r - start_r)[:, None]
+
+        # Горизонтальные линии сетки: каждая строка узлов - от точки на левой границе до точки на правой
+        left_r, right_r = side_r
+        left_z, right_z = side_z
+
+        r = MeshBuilder.progression_offsets(right_r - left_r, self.mesh_parameters.abscissa_splits,
+                                            self.mesh_parameters.abscissa_k)
+        r += left_r[:, None]
+        r[:, -1] = right_r
+
+        # z = left_z + t * (right_z - left_z), t = (r - left_r) / (right_r - left_r); считается на месте
+        z = r - left_r[:, None]
+        z /= (right_r - left_r)[:, None]
+        z *= (right_z - left_z)[:, None]
+        z += left_z[:, None]
+        z[:, -1] = right_z
+
+        self.points = PointArray(r.ravel(), z.ravel())
 
         self.ir[1] = self.mesh_parameters.abscissa_splits
         self.iz[1] = self.mesh_parameters.ordinate_splits
@@ -133,17 +103,12 @@ class MeshBuilder:
         nx = self.mesh_parameters.abscissa_splits + 1
         ny = self.mesh_parameters.ordinate_splits + 1
 
-        ielem = 0
-        for i in range(ny - 1):
-            for j in range(nx - 1):
-                nodes = [
-                    i * nx + j,  # левый нижний
-                    i * nx + j + 1,  # правый нижний
-                    (i + 1) * nx + j,  # левый верхний
-                    (i + 1) * nx + j + 1  # правый верхний
-                ]
-                self.elements[ielem] = BiquadraticQuadElement(nodes, 0)
-                ielem += 1
+        # элементы по строкам: левый нижний, правый нижний, левый верхний, правый верхний узлы
+        i, j = np.divmod(np.arange((nx - 1) * (ny - 1)), nx - 1)
+        first = i * nx + j
+        corners = np.column_stack((first, first + 1, first + nx, first + nx + 1))
+
+        self.elements = ElementArray(corners, np.zeros(len(corners), dtype=np.int32))
 
     def create_boundaries(self):
         for border in self.mesh_parameters.borders:
@@ -158,12 +123,10 @@ class MeshBuilder:
             else:
                 self.process_boundary_condition(border, self.dirichlet)
 
-    def process_boundary_condition(self, border: Border, conditions: list):
+    def process_boundary_condition(self, border: Border, conditions: BoundaryConditionArray):
         x_splits = self.mesh_parameters.abscissa_splits
-        y_splits = self.mesh_parameters.ordinate_splits
 
         nx = self.mesh_parameters.abscissa_points_count
-        total_nx = self.mesh_parameters.abscissa_splits + 1
 
         ys = border.points_indices[0] // nx
         xs = border.points_indices[0] - ys * nx
@@ -178,79 +141,20 @@ class MeshBuilder:
         (xs, xe) = (xe, xs) if xe < xs else (xs, xe)
         (ys, ye) = (ye, ys) if ye < ys else (ys, ye)
 
-        # Horizontal line (начало и конец по y равны)
+        # Horizontal line (начало и конец по y равны): элементы строки под линией (верх) или над ней (низ)
         if ys == ye:
             # ys=ye=0 значит это нижняя граница (т.к. индекс первой точки по оси Y равен 0)
             local_border_index = 0 if ys == 0 else 3
-            ielem = 0 if local_border_index == 0 else x_splits * (y_splits - 1)
-
-            for j in range(len(self.points)):
-                iy = j // total_nx
-                ix = j - iy * total_nx
-
-                # if point is not on the line
-                if iy != ys or ix < xs or ix > xe:
-                    continue
-
-                formula = self.mesh_parameters.boundary_formulas[border.formula_index]
-
-                if isinstance(formula, BoundaryFormulaS3):
-                    conditions.append(BoundaryConditionS3(ielem, local_border_index, formula.value, formula.beta))
-                    ielem += 1
-                else:
-                    conditions.append(BoundaryCondition(ielem, local_border_index, formula.value))
-                    ielem += 1
-
-                # идем по всем точкам горизонтальной оси
-                while ix + 1 != xe:
-                    j += 1
-                    ix = j - iy * total_nx
-
-                    formula = self.mesh_parameters.boundary_formulas[border.formula_index]
-
-                    if isinstance(formula, BoundaryFormulaS3):
-                        conditions.append(BoundaryConditionS3(ielem, local_border_index, formula.value, formula.beta))
-                        ielem += 1
-                    else:
-                        conditions.append(BoundaryCondition(ielem, local_border_index, formula.value))
-                        ielem += 1
-
-                break
-        # Vertical line
+            row = 0 if local_border_index == 0 else ys - 1
+            elements = row * x_splits + np.arange(xs, xe)
+        # Vertical line: элементы столбца справа от линии (лево) или слева от нее (право)
         else:
             # xs=xe=0 значит это левая граница (т.к. индекс первой точки по оси X равен 0)
             local_border_index = 1 if xs == 0 else 2
-            ielem = 0 if local_border_index == 1 else x_splits - 1
-
-            for j in range(len(self.points)):
-                iy = j // total_nx
-                ix = j - iy * total_nx
-
-                # If point is not on the line
-                if ix != xs or iy < ys or iy > ye:
-                    continue
-
-                formula = self.mesh_parameters.boundary_formulas[border.formula_index]
-
-                if isinstance(formula, BoundaryFormulaS3):
-                    conditions.append(BoundaryConditionS3(ielem, local_border_index, formula.value, formula.beta))
-                else:
-                    conditions.append(BoundaryCondition(ielem, local_border_index, formula.value))
-
-                # идем по всем точкам вертикальной оси
-                while iy + 1 != ye:
-                    ielem += x_splits
-                    j += total_nx
-                    iy = j // total_nx
-
-                    formula = self.mesh_parameters.boundary_formulas[border.formula_index]
-
-                    if isinstance(formula, BoundaryFormulaS3):
-                        conditions.append(BoundaryConditionS3(ielem, local_border_index, formula.value, formula.beta))
-                    else:
-                        conditions.append(BoundaryCondition(ielem, local_border_index, formula.value))
+            column = 0 if local_border_index == 1 else xs - 1
+            elements = np.arange(ys, ye) * x_splits + column
 
-                break
+        conditions.append(elements, local_border_index, border.formula_index)
 
     def get_mesh(self):
         return Mesh(
@@ -0,0 +1,35 @@
+import numpy as np
+
+from mesh.point import Point
+
+class PointArray:
+    # Узлы сетки в виде двух непрерывных массивов координат r и z.
+    # Для совместимости со старым кодом ведет себя как список Point: points[i] возвращает
+    # Point(r[i], z[i]), созданный по запросу, поэтому объекты Point не хранятся
+    def __init__(self, r: np.ndarray, z: np.ndarray):
+        self.r = np.ascontiguousarray(r, dtype=float)
+        self.z = np.ascontiguousarray(z, dtype=float)
+
+    @staticmethod
+    def from_points(points: list[Point]):
+        return PointArray(np.array([p.r for p in points], dtype=float), np.array([p.z for p in points], dtype=float))
+
+    @staticmethod
+    def zeros(count: int):
+        return PointArray(np.zeros(count), np.zeros(count))
+
+    def __len__(self):
+        return len(self.r)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointArray(self.r[index], self.z[index])
+        return Point(float(self.r[index]), float(self.z[index]))
+
+    def __setitem__(self, index, point: Point):
+        self.r[index] = point.r
+        self.z[index] = point.z
+
+    def __iter__(self):
+        for r, z in zip(self.r.tolist(), self.z.tolist()):
+            yield Point(r, z)
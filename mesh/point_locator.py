@@ -0,0 +1,119 @@
+import numpy as np
+
+from mesh.mesh import Mesh
+
+class PointLocator:
+    # Поиск элемента, содержащего точку. Элементы - прямоугольники со сторонами вдоль осей,
+    # как в FemSolver.find_number_element: точка на общей границе относится к элементу с меньшим номером,
+    # точка вне сетки - к элементу -1.
+    # Для тензорной сетки MeshBuilder (узлы на линиях r_line x z_line, элементы по строкам) номер элемента
+    # находится двоичным поиском по линиям сетки, иначе - перебором элементов в ячейках равномерной сетки корзин
+    def __init__(self, mesh: Mesh):
+        points_r = mesh.points.r
+        points_z = mesh.points.z
+        nodes = mesh.elements.corners.astype(np.int64)
+
+        self.r_min = points_r[nodes[:, 0]]
+        self.z_min = points_z[nodes[:, 0]]
+        self.r_max = points_r[nodes[:, -1]]
+        self.z_max = points_z[nodes[:, -1]]
+
+        self.structured = PointLocator.is_tensor_grid(points_r, points_z, nodes)
+
+        if self.structured:
+            nx = nodes[0, 2]
+            self.r_line = points_r[:nx]
+            self.z_line = points_z[::nx]
+        else:
+            self.build_bins()
+
+    @staticmethod
+    def is_tensor_grid(points_r: np.ndarray, points_z: np.ndarray, nodes: np.ndarray):
+        nx = int(nodes[0, 2])
+        if nx < 2 or len(points_r) % nx != 0:
+            return False
+
+        ny = len(points_r) // nx
+        if len(nodes) != (nx - 1) * (ny - 1):
+            return False
+
+        # элементы по строкам, как в MeshBuilder.create_elements
+        i, j = np.divmod(np.arange(len(nodes)), nx - 1)
+        first = i * nx + j
+        expected = np.column_stack((first, first + 1, first + nx, first + nx + 1))
+        if not np.array_equal(nodes, expected):
+            return False
+
+        r = points_r.reshape(ny, nx)
+        z = points_z.reshape(ny, nx)
+        return bool((r == r[0]).all() and (z == z[:, :1]).all() and
+                    (np.diff(r[0]) > 0).all() and (np.diff(z[:, 0]) > 0).all())
+
+    def build_bins(self):
+        elements_count = len(self.r_min)
+        bins_per_axis = max(1, int(np.sqrt(elements_count)))
+
+        self.bins_r = np.linspace(self.r_min.min(), self.r_max.max(), bins_per_axis + 1)
+        self.bins_z = np.linspace(self.z_min.min(), self.z_max.max(), bins_per_axis + 1)
+        self.bins_per_axis = bins_per_axis
+
+        # для каждого элемента - все корзины, которые пересекает его прямоугольник
+        r_first, r_last = self.bin_index(self.bins_r, self.r_min), self.bin_index(self.bins_r, self.r_max)
+        z_first, z_last = self.bin_index(self.bins_z, self.z_min), self.bin_index(self.bins_z, self.z_max)
+
+        counts = (r_last - r_first + 1) * (z_last - z_first + 1)
+        elements = np.repeat(np.arange(elements_count), counts)
+        local = np.arange(len(elements)) - np.repeat(np.cumsum(counts) - counts, counts)
+        width = np.repeat(r_last - r_first + 1, counts)
+        bins = (np.repeat(z_first, counts) + local // width) * bins_per_axis + np.repeat(r_first, counts) + local % width
+
+        # корзина -> элементы по возрастанию номеров (в формате ig/jg)
+        order = np.lexsort((elements, bins))
+        self.bin_elements = elements[order]
+        self.bin_begin = np.searchsorted(bins[order], np.arange(bins_per_axis * bins_per_axis + 1))
+
+    def bin_index(self, lines: np.ndarray, values: np.ndarray):
+        return np.clip(np.searchsorted(lines, values, side="right") - 1, 0, self.bins_per_axis - 1)
+
+    def locate(self, rs, zs) -> np.ndarray:
+        # номера элементов для массивов координат rs, zs
+        rs = np.atleast_1d(np.asarray(rs, dtype=float))
+        zs = np.atleast_1d(np.asarray(zs, dtype=float))
+
+        if self.structured:
+            return self.locate_structured(rs, zs)
+        return self.locate_in_bins(rs, zs)
+
+    def locate_point(self, r: float, z: float) -> int:
+        return int(self.locate(r, z)[0])
+
+    def locate_structured(self, rs: np.ndarray, zs: np.ndarray):
+        nx = len(self.r_line)
+        ny = len(self.z_line)
+
+        # side="left": точка на внутренней линии попадает в элемент слева/снизу, как при переборе
+        ir = np.clip(np.searchsorted(self.r_line, rs, side="left") - 1, 0, nx - 2)
+        iz = np.clip(np.searchsorted(self.z_line, zs, side="left") - 1, 0, ny - 2)
+
+        result = iz * (nx - 1) + ir
+        outside = (rs < self.r_line[0]) | (rs > self.r_line[-1]) | (zs < self.z_line[0]) | (zs > self.z_line[-1])
+        result[outside] = -1
+        return result
+
+    def locate_in_bins(self, rs: np.ndarray, zs: np.ndarray):
+        bins = self.bin_index(self.bins_z, zs) * self.bins_per_axis + self.bin_index(self.bins_r, rs)
+        begin = self.bin_begin[bins]
+        counts = self.bin_begin[bins + 1] - begin
+
+        # все пары (точка, элемент из ее корзины), среди содержащих точку берется элемент с меньшим номером
+        points = np.repeat(np.arange(len(rs)), counts)
+        candidates = self.bin_elements[np.repeat(begin - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+
+        inside = (self.r_min[candidates] <= rs[points]) & (rs[points] <= self.r_max[candidates]) & \
+                 (self.z_min[candidates] <= zs[points]) & (zs[points] <= self.z_max[candidates])
+
+        elements_count = len(self.r_min)
+        result = np.full(len(rs), elements_count)
+        np.minimum.at(result, points[inside], candidates[inside])
+        result[result == elements_count] = -1
+        return result
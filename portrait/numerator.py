@@ -1,21 +1,40 @@
+import numpy as np
+
 from mesh.mesh import Mesh
 
 class Numerator:
-
     @staticmethod
     def numerate_basis_functions(mesh: Mesh):
-        nx = mesh.elements[0].physical_nodes_indices[2]
+        # базисные функции образуют сетку (2 * nx - 1) x (2 * ny - 1) с построчной нумерацией;
+        # k - номер левой нижней функции элемента
+        nx = int(mesh.elements.corners[0, 2])
+        ielem = np.arange(len(mesh.elements))
+        k = 2 * (ielem // (nx - 1)) * (2 * nx - 1) + 2 * (ielem % (nx - 1))
+
+        shifts = np.array([0, 1, 2, 2 * nx - 1, 2 * nx, 2 * nx + 1, 4 * nx - 2, 4 * nx - 1, 4 * nx])
+        mesh.elements.basis[:] = k[:, None] + shifts
+
+    @staticmethod
+    def element_node_coordinates(corner_values: np.ndarray) -> np.ndarray:
+        # координата (r или z) каждого из 9 базисных узлов элементов по значениям в углах (n_elem, 4);
+        # формулы и порядок операций те же, что в BiquadraticQuadElement.get_basis_node_position
+        c0, c1, c2, c3 = corner_values.T
+        return np.column_stack((
+            c0, (c0 + c1) * 0.5, c1,
+            (c0 + c2) * 0.5, (c0 + c1 + c2 + c3) * 0.25, (c1 + c3) * 0.5,
+            c2, (c2 + c3) * 0.5, c3
+        ))
+
+    @staticmethod
+    def basis_node_positions(mesh: Mesh) -> tuple[np.ndarray, np.ndarray]:
+        # координаты узлов всех базисных функций в глобальной нумерации
+        corners = mesh.elements.corners
+        basis = mesh.elements.basis
 
-        for ielem in range(len(mesh.elements)):
-            element = mesh.elements[ielem]
-            k = 2 * (ielem // (nx - 1)) * (2 * nx - 1) + 2 * (ielem % (nx - 1))
+        func_count = int(basis.max()) + 1
+        r = np.empty(func_count)
+        z = np.empty(func_count)
+        r[basis] = Numerator.element_node_coordinates(mesh.points.r[corners])
+        z[basis] = Numerator.element_node_coordinates(mesh.points.z[corners])
 
-            element.set_basis_index(0, k)
-            element.set_basis_index(1, k + 1)
-            element.set_basis_index(2, k + 2)
-            element.set_basis_index(3, k + 2 * nx - 1)
-            element.set_basis_index(4, k + 2 * nx)
-            element.set_basis_index(5, k + 2 * nx + 1)
-            element.set_basis_index(6, k + 4 * nx - 2)
-            element.set_basis_index(7, k + 4 * nx - 1)
-            element.set_basis_index(8, k + 4 * nx)
+        return r, z
@@ -1,38 +1,128 @@
+import numpy as np
+
 from mesh.mesh import Mesh
 
 class PortraitBuilder:
     @staticmethod
-    def generate_portrait(mesh: Mesh) -> tuple[list[int], list[int]]:
-        func_count = mesh.elements[-1].basis_indices[-1] + 1
-        connectivity_list: list[list[int]] = []
+    def generate_portrait(mesh: Mesh) -> tuple[np.ndarray, np.ndarray]:
+        basis = mesh.elements.basis.astype(np.int64)
+        nx = int(mesh.elements.corners[0, 2])
+
+        if PortraitBuilder.is_structured(basis, nx):
+            return PortraitBuilder.generate_structured_portrait(nx - 1, len(basis) // (nx - 1))
+
+        return PortraitBuilder.generate_general_portrait(basis)
+
+    @staticmethod
+    def is_structured(basis: np.ndarray, nx: int) -> bool:
+        # нумерация совпадает с Numerator.numerate_basis_functions для прямоугольной сетки элементов
+        if nx < 2 or len(basis) % (nx - 1) != 0:
+            return False
+
+        ielem = np.arange(len(basis))
+        k = 2 * (ielem // (nx - 1)) * (2 * nx - 1) + 2 * (ielem % (nx - 1))
+        shifts = np.array([0, 1, 2, 2 * nx - 1, 2 * nx, 2 * nx + 1, 4 * nx - 2, 4 * nx - 1, 4 * nx])
+
+        return bool(np.array_equal(basis, k[:, None] + shifts))
+
+    @staticmethod
+    def element_colours(mesh: Mesh) -> np.ndarray:
+        # раскраска элементов: у элементов одного цвета нет общих базисных функций,
+        # поэтому их вклады в di/gg/b можно складывать одновременно без конфликтов
+        basis = mesh.elements.basis.astype(np.int64)
+        nx = int(mesh.elements.corners[0, 2])
+
+        if PortraitBuilder.is_structured(basis, nx):
+            # шахматная раскраска 2x2: общие функции есть только у соседних по стороне или углу элементов
+            ielem = np.arange(len(basis))
+            return (ielem // (nx - 1) % 2) * 2 + ielem % (nx - 1) % 2
+
+        return PortraitBuilder.greedy_colours(basis)
+
+    @staticmethod
+    def greedy_colours(basis: np.ndarray) -> np.ndarray:
+        # жадная раскраска по порядку элементов: наименьший цвет, которого нет у элементов с общими функциями
+        colours = np.full(len(basis), -1)
+        # used[f] - битовая маска цветов элементов, содержащих функцию f
+        used = np.zeros(int(basis.max()) + 1 if len(basis) > 0 else 0, dtype=np.int64)
+
+        for ielem, functions in enumerate(basis):
+            taken = int(np.bitwise_or.reduce(used[functions]))
+            colour = 0
+            while taken >> colour & 1:
+                colour += 1
+
+            if colour >= 63:
+                raise Exception("Too many colours in element colouring")
+
+            colours[ielem] = colour
+            used[functions] |= 1 << colour
+
+        return colours
+
+    @staticmethod
+    def generate_structured_portrait(elements_x: int, elements_y: int) -> tuple[np.ndarray, np.ndarray]:
+        # базисные функции образуют сетку (2 * elements_x + 1) x (2 * elements_y + 1) с построчной нумерацией.
+        # Функция в узле с четным номером по оси лежит на границе элементов и связана с соседями на расстоянии до 2,
+        # с нечетным - только внутри своего элемента, на расстоянии до 1
+        row_size = 2 * elements_x + 1
+        func_count = row_size * (2 * elements_y + 1)
+
+        node = np.arange(func_count)
+        ix = node % row_size
+        iy = node // row_size
+        reach_x = np.where(ix % 2 == 0, 2, 1)
+        reach_y = np.where(iy % 2 == 0, 2, 1)
+
+        # смещения к соседям с меньшим номером, в порядке возрастания номера соседа
+        offsets = [(dy, dx) for dy in (-2, -1, 0) for dx in (-2, -1, 0, 1, 2) if dy < 0 or dx < 0]
+
+        neighbours = np.empty((func_count, len(offsets)), dtype=np.int32)
+        present = np.empty((func_count, len(offsets)), dtype=bool)
+
+        for k, (dy, dx) in enumerate(offsets):
+            neighbours[:, k] = node + dy * row_size + dx
+            present[:, k] = ((-dy <= reach_y) & (iy + dy >= 0)
+                             & (abs(dx) <= reach_x) & (ix + dx >= 0) & (ix + dx < row_size))
+
+        ig = np.zeros(func_count + 1, dtype=np.int32)
+        np.cumsum(present.sum(axis=1), out=ig[1:])
+        jg = neighbours[present]
+
+        return ig, jg
+
+    @staticmethod
+    def generate_general_portrait(basis: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # все пары (строка, столбец) нижнего треугольника из связности элементов, без повторов
+        func_count = int(basis.max()) + 1
 
-        for i in range(func_count):
-            connectivity_list.append([])
+        rows = np.broadcast_to(basis[:, :, None], (len(basis), 9, 9))
+        cols = np.broadcast_to(basis[:, None, :], (len(basis), 9, 9))
+        lower = rows > cols
 
-        for element in mesh.elements:
-            for node_to_insert in element.basis_indices:
-                for pos_to_insert in element.basis_indices:
-                    if node_to_insert < pos_to_insert:
-                        if node_to_insert not in connectivity_list[pos_to_insert]:
-                            connectivity_list[pos_to_insert].append(node_to_insert)
+        keys = np.sort(rows[lower] * func_count + cols[lower])
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
 
-        for i in range(len(connectivity_list)):
-            connectivity_list[i].sort()
+        ig = np.zeros(func_count + 1, dtype=np.int32)
+        np.cumsum(np.bincount(keys // func_count, minlength=func_count), out=ig[1:])
+        jg = (keys % func_count).astype(np.int32)
 
-        ig: list[int] = [0] * (len(connectivity_list) + 1)
+        return ig, jg
 
-        ig[0] = 0
-        ig[1] = 0
+    @staticmethod
+    def generate_scatter_map(mesh: Mesh, ig, jg) -> np.ndarray:
+        # для каждого элемента таблица (9, 9) позиций в gg: элемент (i, j) локальной матрицы попадает в
+        # gg[map[i, j]] (верхний треугольник отображается на симметричную позицию), -1 - диагональ
+        basis = mesh.elements.basis.astype(np.int64)
+        func_count = len(ig) - 1
 
-        for i in range(1, len(connectivity_list)):
-            ig[i + 1] = ig[i] + len(connectivity_list[i])
+        rows = np.maximum(basis[:, :, None], basis[:, None, :])
+        cols = np.minimum(basis[:, :, None], basis[:, None, :])
 
-        jg: list[int] = [0] * ig[-1]
+        csr_rows = np.repeat(np.arange(func_count, dtype=np.int64), np.diff(ig))
+        csr_keys = csr_rows * func_count + np.asarray(jg, dtype=np.int64)
 
-        j = 0
-        for i in range(1, len(connectivity_list)):
-            for it in connectivity_list[i]:
-                jg[j] = it
-                j += 1
+        scatter_map = np.searchsorted(csr_keys, rows * func_count + cols)
+        scatter_map[rows == cols] = -1
 
-        return ig, jg
\ No newline at end of file
+        return scatter_map
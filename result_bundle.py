@@ -0,0 +1,77 @@
+import numpy as np
+
+class ResultBundle:
+    # Бинарный файл результатов: заголовок, таблица массивов и сами массивы в little-endian.
+    # Каждый массив начинается с границы alignment байт, поэтому и запись, и чтение
+    # идут через numpy.memmap без разбора текста
+    magic = b"FEMRES"
+    version = 1
+    alignment = 64
+
+    header_dtype = np.dtype([("magic", "S8"), ("version", "<u4"), ("count", "<u4")])
+    entry_dtype = np.dtype([("name", "S16"), ("dtype", "S8"), ("rows", "<u8"), ("cols", "<u8"), ("offset", "<u8")])
+
+    @staticmethod
+    def align(offset: int) -> int:
+        return (offset + ResultBundle.alignment - 1) // ResultBundle.alignment * ResultBundle.alignment
+
+    @staticmethod
+    def write(path: str, arrays: dict[str, np.ndarray]):
+        # массивы одномерные или двумерные; значения приводятся к little-endian
+        arrays = {name: np.asarray(a) for name, a in arrays.items()}
+        entries = np.zeros(len(arrays), dtype=ResultBundle.entry_dtype)
+
+        offset = ResultBundle.align(ResultBundle.header_dtype.itemsize + entries.nbytes)
+        for entry, (name, a) in zip(entries, arrays.items()):
+            entry["name"] = name.encode()
+            entry["dtype"] = a.dtype.newbyteorder("<").str.encode()
+            entry["rows"] = a.shape[0] if a.ndim > 0 else 1
+            entry["cols"] = a.shape[1] if a.ndim > 1 else 0
+            entry["offset"] = offset
+            offset = ResultBundle.align(offset + a.nbytes)
+
+        file = np.memmap(path, dtype=np.uint8, mode="w+", shape=max(offset, 1))
+
+        header = file[:ResultBundle.header_dtype.itemsize].view(ResultBundle.header_dtype)
+        header["magic"] = ResultBundle.magic
+        header["version"] = ResultBundle.version
+        header["count"] = len(arrays)
+
+        begin = ResultBundle.header_dtype.itemsize
+        file[begin:begin + entries.nbytes] = entries.view(np.uint8)
+
+        for entry, a in zip(entries, arrays.values()):
+            dtype = np.dtype(entry["dtype"].decode())
+            begin = int(entry["offset"])
+            file[begin:begin + a.nbytes].view(dtype)[:] = a.ravel()
+
+        file.flush()
+        del file
+
+    @staticmethod
+    def read(path: str) -> dict[str, np.ndarray]:
+        # возвращает отображения массивов на файл (только чтение)
+        header = np.memmap(path, dtype=ResultBundle.header_dtype, mode="r", shape=1)[0]
+
+        if header["magic"] != ResultBundle.magic:
+            raise Exception(f"File '{path}' is not a result bundle")
+        if header["version"] != ResultBundle.version:
+            raise Exception(f"Unsupported result bundle version {header['version']} in '{path}'")
+
+        entries = np.memmap(path, dtype=ResultBundle.entry_dtype, mode="r", shape=int(header["count"]),
+                            offset=ResultBundle.header_dtype.itemsize)
+
+        arrays = {}
+        for entry in entries:
+            rows, cols = int(entry["rows"]), int(entry["cols"])
+            shape = (rows, cols) if cols > 0 else (rows,)
+            dtype = np.dtype(entry["dtype"].decode())
+
+            if rows * max(cols, 1) == 0:
+                arrays[entry["name"].decode()] = np.zeros(shape, dtype=dtype)
+                continue
+
+            arrays[entry["name"].decode()] = np.memmap(path, dtype=dtype, mode="r", shape=shape,
+                                                       offset=int(entry["offset"]))
+
+        return arrays
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+from mesh.mesh import Mesh
+from mesh.mesh_parameters import MeshParameters
+from mesh.mesh_builder import MeshBuilder
+from mesh.point_array import PointArray
+from mesh.element_array import ElementArray
+from mesh.boundary_condition_array import BoundaryConditionArray
+from mesh.formula import Formula
+from portrait.portrait_builder import PortraitBuilder
+from fem.sparse_matrix import SparseMatrix
+from result_bundle import ResultBundle
+
+class SolveCache:
+    # Кэш этапов расчета на диске. Ключ записи - хеш входных данных этапа:
+    #   mesh-<геометрия>      - узлы, элементы и краевые условия (MeshBuilder),
+    #   portrait-<геометрия>  - ig, jg и карта позиций сборки (PortraitBuilder),
+    #   system-<задача>       - матрица и правая часть с учетом краевых и перенос первых краевых (MatrixAssembler).
+    # Геометрия - опорные точки, границы, разбиения и refinement; задача - геометрия, коэффициенты
+    # и текст формул. Записи хранятся файлами ResultBundle, при превышении max_bytes удаляются
+    # давно не использованные (время изменения файла обновляется при каждом чтении).
+    # В каждый ключ входит версия: format_version (увеличивается вручную при смене формата записей) и хеш
+    # исходного кода сетки, портрета и сборки - записи, построенные прежним кодом, не используются
+    condition_names = {"dirichlet": "dir", "neumann": "neu", "newton": "new"}
+
+    format_version = 2
+    # модули (пути от корня проекта), от которых зависят сетка, портрет и собранная система
+    source_paths = ["mesh", "portrait", "fem/matrix_assembler.py", "fem/reference_element.py", "fem/basis.py",
+                    "fem/integrator.py", "fem/gauss.py", "fem/matrix.py", "fem/sparse_matrix.py", "solve_cache.py"]
+    code_digest = None
+
+    def __init__(self, directory: str = "cache", max_bytes: int = 2 ** 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def code_version() -> str:
+        # хеш исходного кода считается один раз за запуск
+        if SolveCache.code_digest is None:
+            root = os.path.dirname(os.path.abspath(__file__))
+            files = []
+            for source in SolveCache.source_paths:
+                path = os.path.join(root, source)
+                if os.path.isdir(path):
+                    files += [os.path.join(path, name) for name in os.listdir(path) if name.endswith(".py")]
+                else:
+                    files.append(path)
+
+            sha = hashlib.sha256()
+            for path in sorted(files):
+                sha.update(os.path.relpath(path, root).encode())
+                with open(path, "rb") as file:
+                    sha.update(file.read())
+            SolveCache.code_digest = sha.hexdigest()
+
+        return f"{SolveCache.format_version}-{SolveCache.code_digest}"
+
+    @staticmethod
+    def digest(data) -> str:
+        keyed = {"version": SolveCache.code_version(), "data": data}
+        return hashlib.sha256(json.dumps(keyed, sort_keys=True).encode()).hexdigest()[:32]
+
+    @staticmethod
+    def geometry_data(parameters: MeshParameters) -> dict:
+        return {
+            "points_count": [parameters.abscissa_points_count, parameters.ordinate_points_count],
+            "control_points": [[p.r, p.z] for p in parameters.control_points],
+            "borders": [[list(b.points_indices), b.boundary_type.value, b.formula_index] for b in parameters.borders],
+            "splits": [parameters.abscissa_splits, parameters.ordinate_splits],
+            "k": [parameters.abscissa_k, parameters.ordinate_k],
+            "refinement": parameters.refinement
+        }
+
+    @staticmethod
+    def formula_text(formula):
+        # текст выражения Formula (в том числе внутри BoundaryFormula); для произвольной функции Python - None
+        if isinstance(formula, Formula):
+            return formula.expression
+        if hasattr(formula, "value"):
+            text = SolveCache.formula_text(formula.value)
+            return None if text is None else [text, getattr(formula, "beta", None)]
+        return None
+
+    @staticmethod
+    def coefficient(value):
+        if isinstance(value, (int, float)):
+            return value
+        return SolveCache.formula_text(value)
+
+    @staticmethod
+    def problem_data(parameters: MeshParameters):
+        # None, если какая-то формула задана функцией Python и ее нельзя сравнить по тексту
+        # коэффициенты - числа или выражения от решения (Formula)
+        materials = [[SolveCache.coefficient(m.lmbda), SolveCache.coefficient(m.gamma), SolveCache.formula_text(m.f)]
+                     for m in parameters.area_properties]
+        formulas = [SolveCache.formula_text(f) for f in parameters.boundary_formulas]
+
+        if any(value is None for m in materials for value in m) or any(f is None for f in formulas):
+            return None
+        return {"geometry": SolveCache.geometry_data(parameters), "materials": materials, "formulas": formulas}
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def load(self, key: str) -> dict[str, np.ndarray] | None:
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+
+        arrays = {name: np.array(a) for name, a in ResultBundle.read(path).items()}
+        os.utime(path)
+        return arrays
+
+    def store(self, key: str, arrays: dict[str, np.ndarray]):
+        # запись во временный файл и переименование: прерванная запись не оставляет испорченной записи
+        path = self.path(key)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        ResultBundle.write(temporary, arrays)
+        os.replace(temporary, path)
+
+        self.evict(keep=path)
+
+    def evict(self, keep: str = None):
+        entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".bin")]
+        entries.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in entries)
+
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def build_mesh(self, parameters: MeshParameters) -> Mesh:
+        # сетка из кэша или MeshBuilder; нумерация базисных функций не хранится - она считается по формуле
+        key = f"mesh-{SolveCache.digest(SolveCache.geometry_data(parameters))}"
+        arrays = self.load(key)
+
+        if arrays is None:
+            mesh_builder = MeshBuilder(parameters)
+            mesh_builder.create_points()
+            mesh_builder.create_elements()
+            mesh_builder.create_boundaries()
+            mesh = mesh_builder.get_mesh()
+
+            arrays = {"points_r": mesh.points.r, "points_z": mesh.points.z,
+                      "corners": mesh.elements.corners, "area_numbers": mesh.elements.area_numbers}
+            for name, prefix in SolveCache.condition_names.items():
+                conditions = getattr(mesh, name)
+                arrays[f"{prefix}_elements"] = conditions.elements
+                arrays[f"{prefix}_borders"] = conditions.local_borders
+                arrays[f"{prefix}_formulas"] = conditions.formula_indices
+
+            self.store(key, arrays)
+            return mesh
+
+        conditions = [BoundaryConditionArray(parameters.boundary_formulas, arrays[f"{prefix}_elements"],
+                                             arrays[f"{prefix}_borders"], arrays[f"{prefix}_formulas"])
+                      for prefix in SolveCache.condition_names.values()]
+
+        return Mesh(PointArray(arrays["points_r"], arrays["points_z"]),
+                    ElementArray(arrays["corners"], arrays["area_numbers"]),
+                    parameters.area_properties, *conditions)
+
+    def portrait(self, mesh: Mesh, parameters: MeshParameters) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # портрет и карта позиций сборки для пронумерованной сетки
+        key = f"portrait-{SolveCache.digest(SolveCache.geometry_data(parameters))}"
+        arrays = self.load(key)
+
+        if arrays is None:
+            ig, jg = PortraitBuilder.generate_portrait(mesh)
+            scatter_map = PortraitBuilder.generate_scatter_map(mesh, ig, jg)
+            self.store(key, {"ig": ig, "jg": jg, "scatter_map": scatter_map.reshape(len(scatter_map), 81)})
+            return ig, jg, scatter_map
+
+        return arrays["ig"], arrays["jg"], arrays["scatter_map"].reshape(-1, 9, 9)
+
+    def system_key(self, parameters: MeshParameters) -> str | None:
+        data = SolveCache.problem_data(parameters)
+        return None if data is None else f"system-{SolveCache.digest(data)}"
+
+    def load_system(self, parameters: MeshParameters) -> tuple[np.ndarray, np.ndarray, np.ndarray, tuple] | None:
+        # (di, gg, b, dirichlet_lifting) собранной системы с учетом краевых или None
+        key = self.system_key(parameters)
+        arrays = self.load(key) if key is not None else None
+        if arrays is None:
+            return None
+
+        lifting = (arrays["lift_rows"].astype(np.int64), arrays["lift_cols"].astype(np.int64), arrays["lift_values"])
+        return arrays["di"], arrays["gg"], arrays["b"], lifting
+
+    def store_system(self, parameters: MeshParameters, matrix: SparseMatrix, vector: np.ndarray, lifting: tuple):
+        # lifting - перенос первых краевых в правую часть (MatrixAssembler.dirichlet_lifting)
+        key = self.system_key(parameters)
+        if key is not None:
+            rows, cols, values = lifting
+            self.store(key, {"di": np.asarray(matrix.di), "gg": np.asarray(matrix.gg), "b": np.asarray(vector),
+                             "lift_rows": np.asarray(rows), "lift_cols": np.asarray(cols),
+                             "lift_values": np.asarray(values)})
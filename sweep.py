@@ -0,0 +1,178 @@
+import argparse
+import copy
+import csv
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from mesh.mesh_parameters import MeshParameters
+from mesh.mesh_builder import MeshBuilder
+from fem.fem_solver import FemSolver
+from fem.nonlinear_solver import NonlinearSolver
+from fem.solve_report import SolveReport
+
+class SweepRunner:
+    # Перебор вариантов area.json: к базовому файлу применяются все сочетания значений из сетки параметров
+    # {"путь": [значения]}, путь - ключи через точку ("refinement", "area_properties.0.lmbda").
+    # Варианты с одинаковой геометрией решаются в одном процессе подряд: сетка, нумерация и портрет
+    # строятся один раз, а для следующих вариантов меняются только коэффициенты и формулы (FemSolver.set_problem).
+    # Варианты с коэффициентами, зависящими от решения, решаются NonlinearSolver (метод Ньютона, как в main.py).
+    # Каждый вариант пишет результаты в свою папку, общая таблица - results.csv в output_root
+
+    # поля, от которых зависят сетка, нумерация, портрет и списки краевых условий
+    geometry_keys = ["abscissa_points_count", "ordinate_points_count", "control_points", "borders",
+                     "abscissa_splits", "ordinate_splits", "abscissa_k", "ordinate_k", "refinement"]
+
+    table_columns = ["case", "parameters", "dofs", "iterations", "relative_residual", "nodal_error",
+                     "reused_geometry", "assembly_time", "solve_time", "total_time", "output_dir"]
+
+    def __init__(self, base: dict, grid: dict[str, list], output_root: str = "output/sweep", workers: int = None):
+        self.base = base
+        self.grid = grid
+        self.output_root = output_root
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+
+    @staticmethod
+    def set_parameter(data: dict, path: str, value):
+        keys = path.split(".")
+        target = data
+        for key in keys[:-1]:
+            target = target[int(key)] if isinstance(target, list) else target[key]
+
+        last = keys[-1]
+        if isinstance(target, list):
+            target[int(last)] = value
+        else:
+            target[last] = value
+
+    def cases(self) -> list[dict]:
+        paths = list(self.grid.keys())
+        cases = []
+
+        for index, values in enumerate(itertools.product(*(self.grid[p] for p in paths))):
+            data = copy.deepcopy(self.base)
+            overrides = dict(zip(paths, values))
+            for path, value in overrides.items():
+                SweepRunner.set_parameter(data, path, value)
+
+            cases.append({
+                "case": index,
+                "parameters": overrides,
+                "data": data,
+                "output_dir": os.path.join(self.output_root, f"case_{index:03d}")
+            })
+
+        return cases
+
+    @staticmethod
+    def geometry_key(data: dict) -> str:
+        return json.dumps({key: data[key] for key in SweepRunner.geometry_keys}, sort_keys=True)
+
+    def tasks(self, cases: list[dict]) -> list[list[dict]]:
+        # варианты группируются по геометрии; большие группы делятся на части, чтобы загрузить все процессы
+        groups: dict[str, list[dict]] = {}
+        for case in cases:
+            groups.setdefault(SweepRunner.geometry_key(case["data"]), []).append(case)
+
+        chunk_size = max(1, math.ceil(len(cases) / self.workers))
+        return [group[i:i + chunk_size] for group in groups.values() for i in range(0, len(group), chunk_size)]
+
+    @staticmethod
+    def run_cases(cases: list[dict]) -> list[dict]:
+        # варианты с общей геометрией: сетка строится по первому, остальные переиспользуют FemSolver
+        # (нелинейные - NonlinearSolver; при смене линейной задачи на нелинейную решатель создается заново)
+        results = []
+        solver = None
+
+        for case in cases:
+            parameters = MeshParameters.from_dict(case["data"])
+            os.makedirs(case["output_dir"], exist_ok=True)
+            nonlinear = any(area.nonlinear for area in parameters.area_properties)
+
+            if solver is None or nonlinear != isinstance(solver, NonlinearSolver):
+                report = SolveReport()
+                with report.phase("mesh"):
+                    mesh_builder = MeshBuilder(parameters)
+                    mesh_builder.create_points()
+                    mesh_builder.create_elements()
+                    mesh_builder.create_boundaries()
+                    mesh = mesh_builder.get_mesh()
+
+                if nonlinear:
+                    solver = NonlinearSolver(mesh, method="newton", report=report, output_dir=case["output_dir"])
+                else:
+                    # следующие варианты группы меняют только коэффициенты и f - пересборка без локальных интегралов
+                    solver = FemSolver(mesh, report=report, output_dir=case["output_dir"], incremental=True)
+                reused = False
+            else:
+                solver.set_problem(parameters, case["output_dir"])
+                reused = True
+
+            report = solver.solve()
+            report.dump_json(os.path.join(case["output_dir"], "report.json"))
+            phases = {p.name: p.wall_time for p in report.phases}
+
+            results.append({
+                "case": case["case"],
+                "parameters": json.dumps(case["parameters"], ensure_ascii=False),
+                "dofs": report.size,
+                "iterations": report.iterations_count,
+                "relative_residual": report.relative_residual,
+                "nodal_error": solver.compare_solution_with_exact_in_nodes() if len(solver.mesh.dirichlet) > 0 else None,
+                "reused_geometry": reused,
+                "assembly_time": phases.get("assembly", 0.0),
+                "solve_time": phases.get("solve", 0.0),
+                "total_time": report.total_time(),
+                "output_dir": case["output_dir"]
+            })
+
+        return results
+
+    def run(self) -> list[dict]:
+        tasks = self.tasks(self.cases())
+        os.makedirs(self.output_root, exist_ok=True)
+
+        if self.workers == 1:
+            chunks = [SweepRunner.run_cases(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                chunks = list(pool.map(SweepRunner.run_cases, tasks))
+
+        results = sorted((r for chunk in chunks for r in chunk), key=lambda r: r["case"])
+        self.write_table(results, os.path.join(self.output_root, "results.csv"))
+        return results
+
+    @staticmethod
+    def write_table(results: list[dict], path: str):
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=SweepRunner.table_columns)
+            writer.writeheader()
+            writer.writerows(results)
+
+    @staticmethod
+    def print_table(results: list[dict]):
+        print("Вариант Параметры Неизвестных Итерации Погрешность Сборка,с Решение,с Всего,с")
+
+        for r in results:
+            error = f"{r['nodal_error']:.2e}" if r["nodal_error"] is not None else "-"
+            print(f"{r['case']} {r['parameters']} {r['dofs']} {r['iterations']} {error} "
+                  f"{r['assembly_time']:.3f} {r['solve_time']:.3f} {r['total_time']:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перебор вариантов area.json")
+    parser.add_argument("base", help="базовый area.json")
+    parser.add_argument("grid", help='JSON с сеткой параметров, например {"refinement": [0, 1, 2]}')
+    parser.add_argument("--output", default="output/sweep", help="папка для результатов")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов")
+    args = parser.parse_args()
+
+    with open(args.base, "r") as file:
+        base = json.load(file)
+    with open(args.grid, "r") as file:
+        grid = json.load(file)
+
+    runner = SweepRunner(base, grid, args.output, args.workers)
+    SweepRunner.print_table(runner.run())
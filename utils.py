@@ -1,64 +1,82 @@
+import os
+import numpy as np
+
 from mesh.mesh import Mesh
-from mesh.point import Point
+from portrait.numerator import Numerator
+from result_bundle import ResultBundle
 
 class Utils:
     @staticmethod
-    def save_mesh(mesh: Mesh):
+    def save_mesh(mesh: Mesh, output_dir: str = "output"):
         # points
-        with open("output/points", "w") as file:
-            for p in mesh.points:
-                file.write(f"{p.r} {p.z}\n")
+        with open(os.path.join(output_dir, "points"), "w") as file:
+            for r, z in zip(mesh.points.r.tolist(), mesh.points.z.tolist()):
+                file.write(f"{r} {z}\n")
 
         # elements
-        with open("output/elements", "w") as file:
-            for e in mesh.elements:
-                nodes = e.physical_nodes_indices
+        with open(os.path.join(output_dir, "elements"), "w") as file:
+            for nodes in mesh.elements.corners.tolist():
                 file.write(f"{nodes[0]} {nodes[1]} {nodes[2]} {nodes[3]}\n")
 
         # dirichlet
-        with open("output/dirichlet", "w") as file:
+        with open(os.path.join(output_dir, "dirichlet"), "w") as file:
             for d in mesh.dirichlet:
                 file.write(f"{d.element} {d.local_border} {d.value}\n")
 
         # neumann
-        with open("output/neumann", "w") as file:
+        with open(os.path.join(output_dir, "neumann"), "w") as file:
             for n in mesh.neumann:
                 file.write(f"{n.element} {n.local_border} {n.value}\n")
 
         #newton
-        with open("output/newton", "w") as file:
+        with open(os.path.join(output_dir, "newton"), "w") as file:
             for n in mesh.newton:
                 file.write(f"{n.element} {n.local_border} {n.value}\n")
 
     @staticmethod
-    def save_solution(mesh: Mesh, solution: list[float]):
-        dict_solution: dict[int, tuple[Point, float]] = {}
-
-        for element in mesh.elements:
-            for i in range(9):
-                g = element.get_global_basis_index(i)
-
-                if g in dict_solution:
-                    continue
-
-                global_point = element.get_basis_node_position(i, lambda idx: mesh.points[idx])
-                dict_solution[g] = (global_point, solution[g])
+    def save_solution(mesh: Mesh, solution: list[float], output_dir: str = "output"):
+        # по одной строке "r z значение" на базисную функцию в порядке глобальных номеров
+        basis_r, basis_z = Numerator.basis_node_positions(mesh)
+        values = np.asarray(solution, dtype=float)
 
-        ordered_solution = sorted(dict_solution.items(), key=lambda x: x[0])
+        with open(os.path.join(output_dir, "solution"), "w") as file:
+            for r, z, value in zip(basis_r.tolist(), basis_z.tolist(), values.tolist()):
+                file.write(f"{r} {z} {value}\n")
 
-        with open("output/solution", "w") as file:
-            for global_idx, (point, value) in ordered_solution:
-                file.write(f"{point.r} {point.z} {value}\n")
+        # draw.py предпочитает result.bin: бинарный результат прошлого запуска закрыл бы это решение
+        bundle_path = os.path.join(output_dir, "result.bin")
+        if os.path.exists(bundle_path):
+            os.remove(bundle_path)
 
     @staticmethod
-    def save_basis_info(mesh: Mesh):
-        with open("output/basis", "w") as file:
-            for e in mesh.elements:
-                nodes = e.basis_indices
+    def save_basis_info(mesh: Mesh, output_dir: str = "output"):
+        with open(os.path.join(output_dir, "basis"), "w") as file:
+            for nodes in mesh.elements.basis.tolist():
                 file.write(" ".join(str(node) for node in nodes) + "\n")
 
     @staticmethod
-    def print_vector(vector: list, path: str):
-        with open(f"output/{path}", "w") as file:
+    def print_vector(vector: list, path: str, output_dir: str = "output"):
+        with open(os.path.join(output_dir, path), "w") as file:
             for i in range(len(vector)):
-                file.write(f"{vector[i]}\n")
\ No newline at end of file
+                file.write(f"{vector[i]}\n")
+
+    @staticmethod
+    def save_result_bundle(mesh: Mesh, solution, output_dir: str = "output"):
+        # все, что пишут save_mesh, save_basis_info и save_solution, одним бинарным файлом
+        basis_r, basis_z = Numerator.basis_node_positions(mesh)
+
+        def borders(conditions):
+            return np.column_stack((conditions.elements, conditions.local_borders))
+
+        ResultBundle.write(os.path.join(output_dir, "result.bin"), {
+            "points": np.column_stack((mesh.points.r, mesh.points.z)),
+            "elements": mesh.elements.corners,
+            "basis": mesh.elements.basis,
+            "area_numbers": mesh.elements.area_numbers,
+            "dirichlet": borders(mesh.dirichlet),
+            "neumann": borders(mesh.neumann),
+            "newton": borders(mesh.newton),
+            "newton_beta": mesh.newton.betas,
+            "basis_nodes": np.column_stack((basis_r, basis_z)),
+            "solution": np.asarray(solution, dtype=float)
+        })